@@ -1,11 +1,20 @@
-from typing import TypedDict, List, Optional, Union, TypeVar
+from typing import Callable, TypedDict, List, Optional, Tuple, Union, TypeVar
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
+import inspect
 import json
+import threading
+import time
+import weakref
 
-from lib.state_machine import StateMachine, Step, EntryPoint, Termination, Run
-from lib.llm import LLM
-from lib.messages import AIMessage, UserMessage, SystemMessage, ToolMessage
+from lib.state_machine import StateMachine, Step, EntryPoint, Termination, Run, Resource
+from lib.llm import LLM, AsyncLLM, TokenCallback
+from lib.llm_cache import ResponseCache
+from lib.messages import AIMessage, BaseMessage, UserMessage, SystemMessage, ToolMessage
 from lib.tooling import Tool, ToolCall
 from lib.memory import ShortTermMemory
+from lib.run_store import RunStore
+from lib.context import ContextManager
 
 # Define the state schema
 class AgentState(TypedDict):
@@ -14,13 +23,32 @@ class AgentState(TypedDict):
     messages: List[dict]  # List of conversation messages
     current_tool_calls: Optional[List[ToolCall]]  # Current pending tool calls
     total_tokens: int  # Track the cumulative total
+    context_tokens_saved: int  # Prompt tokens trimmed by the context manager this turn
     
+class _ToolCallStart:
+    """Records when a pooled tool call starts running (or is cancelled)"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.time: Optional[float] = None
+
+    def __call__(self):
+        if self.time is None:
+            self.time = time.monotonic()
+        self.event.set()
+
+
 class Agent:
     def __init__(self, 
                  model_name: str,
                  instructions: str, 
                  tools: List[Tool] = None,
-                 temperature: float = 0.7):
+                 temperature: float = 0.7,
+                 run_store: Optional[RunStore] = None,
+                 context_manager: Optional[ContextManager] = None,
+                 max_tool_workers: int = 8,
+                 tool_timeout: Optional[float] = None,
+                 llm_cache: Optional[ResponseCache] = None):
         """
         Initialize an Agent
         
@@ -29,15 +57,35 @@ class Agent:
             instructions: System instructions for the agent
             tools: Optional list of tools available to the agent
             temperature: Temperature parameter for LLM (default: 0.7)
+            run_store: Optional persistent store for session history. When set,
+                snapshots are streamed to it and runs are not kept in memory
+            context_manager: Optional token budget for the prompt. When set,
+                only a window of recent turns (plus a summary) is sent to the LLM
+            max_tool_workers: Maximum number of tool calls run concurrently (default: 8)
+            tool_timeout: Default seconds to wait for a tool call once it starts
+                running, overridden by ``Tool.timeout`` (default: no timeout)
+            llm_cache: Optional response cache shared by the agent's LLM calls
         """
         self.instructions = instructions
         self.tools = tools if tools else []
+        # Tools the cached LLMs and the name lookup were built from
+        self._known_tools: List[Tool] = list(self.tools)
+        self._tools_by_name = {t.name: t for t in self.tools}
         self.model_name = model_name
         self.temperature = temperature
+        self.run_store = run_store
+        self.context_manager = context_manager
+        self._llm: Optional[LLM] = None
+        self._async_llm: Optional[AsyncLLM] = None
+        self.max_tool_workers = max_tool_workers
+        self.tool_timeout = tool_timeout
+        self._tool_pool: Optional[ThreadPoolExecutor] = None
+        self.llm_cache = llm_cache
         
         # Initialize memory and state machine
         self.memory = ShortTermMemory()
-        self.workflow = self._create_state_machine()
+        self.workflow = self._create_state_machine(self._llm_step, self._tool_step)
+        self.async_workflow = self._create_state_machine(self._allm_step, self._atool_step)
 
     def _prepare_messages_step(self, state: AgentState) -> AgentState:
         """Step logic: Prepare messages for LLM consumption"""
@@ -47,24 +95,75 @@ class Agent:
         if not messages:
             messages = [SystemMessage(content=state["instructions"])]
             
-        # Add the new user message
-        messages.append(UserMessage(content=state["user_query"]))
+        # Add the new user message (state values are immutable, so build a new list)
+        messages = messages + [UserMessage(content=state["user_query"])]
         
         return {
             "messages": messages,
             "session_id": state["session_id"]
         }
 
-    def _llm_step(self, state: AgentState) -> AgentState:
+    def _sync_tools(self):
+        """Rebuild the tool lookup and drop the cached LLMs if ``self.tools`` changed"""
+        if self.tools != self._known_tools:
+            self._known_tools = list(self.tools)
+            self._tools_by_name = {t.name: t for t in self.tools}
+            self._llm = None
+            self._async_llm = None
+
+    def _get_llm(self, async_llm: bool = False) -> LLM:
+        """Get the agent's LLM, created on first use and reused across steps
+        
+        The LLM keeps the precomputed tool schemas and a pooled client, so
+        tool round-trips reuse open connections. It is rebuilt if the
+        agent's tools were changed (reassigned or modified in place).
+        """
+        self._sync_tools()
+        llm = self._async_llm if async_llm else self._llm
+        if llm is None:
+            llm_class = AsyncLLM if async_llm else LLM
+            llm = llm_class(
+                model=self.model_name,
+                temperature=self.temperature,
+                tools=self.tools,
+                cache=self.llm_cache,
+            )
+            if async_llm:
+                self._async_llm = llm
+            else:
+                self._llm = llm
+        return llm
+
+    @staticmethod
+    def _on_token(resource: Optional[Resource]) -> Optional[TokenCallback]:
+        return resource.vars.get("on_token") if resource else None
+
+    def _llm_step(self, state: AgentState, resource: Optional[Resource] = None) -> AgentState:
         """Step logic: Process the current state through the LLM"""
-        # Initialize LLM
-        llm = LLM(
-            model=self.model_name,
-            temperature=self.temperature,
-            tools=self.tools
-        )
+        llm = self._get_llm()
 
-        response = llm.invoke(state["messages"])
+        messages, tokens_saved = self._prepare_context(state["messages"])
+        response = llm.invoke(messages, on_token=self._on_token(resource))
+        return self._process_llm_response(state, response, tokens_saved)
+
+    async def _allm_step(self, state: AgentState, resource: Optional[Resource] = None) -> AgentState:
+        """Step logic: Process the current state through the async LLM"""
+        llm = self._get_llm(async_llm=True)
+
+        # Summarizing may call the LLM, so keep it off the event loop
+        messages, tokens_saved = await asyncio.to_thread(self._prepare_context, state["messages"])
+        response = await llm.invoke(messages, on_token=self._on_token(resource))
+        return self._process_llm_response(state, response, tokens_saved)
+
+    def _prepare_context(self, messages: List[BaseMessage]) -> Tuple[List[BaseMessage], int]:
+        """Apply the context manager to the conversation, if one is configured"""
+        if not self.context_manager:
+            return messages, 0
+        return self.context_manager.prepare(messages)
+
+    def _process_llm_response(self, state: AgentState, response: AIMessage,
+                              tokens_saved: int = 0) -> AgentState:
+        """Append the LLM response to the conversation and track token usage"""
         tool_calls = response.tool_calls if response.tool_calls else None
 
         current_total = state.get("total_tokens", 0)
@@ -82,28 +181,70 @@ class Agent:
             "current_tool_calls": tool_calls,
             "session_id": state["session_id"],
             "total_tokens": current_total,
+            "context_tokens_saved": state.get("context_tokens_saved", 0) + tokens_saved,
         }
 
-    def _tool_step(self, state: AgentState) -> AgentState:
-        """Step logic: Execute any pending tool calls"""
-        tool_calls = state["current_tool_calls"] or []
-        tool_messages = []
-        
-        for call in tool_calls:
-            # Access tool call data correctly
-            function_name = call.function.name
-            function_args = json.loads(call.function.arguments)
-            tool_call_id = call.id
-            # Find the matching tool
-            tool = next((t for t in self.tools if t.name == function_name), None)
+    def _get_tool_pool(self) -> ThreadPoolExecutor:
+        """Thread pool shared by the agent's tool calls, created on first use"""
+        if self._tool_pool is None:
+            self._tool_pool = ThreadPoolExecutor(
+                max_workers=self.max_tool_workers,
+                thread_name_prefix="agent-tool",
+            )
+            # Also release the workers of agents dropped without ``close``
+            weakref.finalize(self, self._tool_pool.shutdown, wait=False, cancel_futures=True)
+        return self._tool_pool
+
+    def close(self):
+        """Shut down the agent's tool pool, cancelling tool calls that have not started"""
+        if self._tool_pool is not None:
+            self._tool_pool.shutdown(wait=False, cancel_futures=True)
+            self._tool_pool = None
+
+    def _pending_tool_calls(self, state: AgentState) -> List[Tuple[ToolCall, Tool, dict]]:
+        """Resolve the pending tool calls to (call, tool, arguments), skipping unknown tools"""
+        self._sync_tools()
+        pending = []
+        for call in state["current_tool_calls"] or []:
+            tool = self._tools_by_name.get(call.function.name)
             if tool:
-                result = str(tool(**function_args))
-                tool_message = ToolMessage(
-                    content=json.dumps(result), 
-                    tool_call_id=tool_call_id, 
-                    name=function_name, 
-                )
-                tool_messages.append(tool_message)
+                pending.append((call, tool, json.loads(call.function.arguments)))
+        return pending
+
+    def _tool_timeout(self, tool: Tool) -> Optional[float]:
+        return tool.timeout if tool.timeout is not None else self.tool_timeout
+
+    def _timeout_result(self, tool: Tool) -> str:
+        return f"Error: tool '{tool.name}' timed out after {self._tool_timeout(tool)} seconds"
+
+    @staticmethod
+    def _run_tool(tool: Tool, args: dict):
+        result = tool(**args)
+        # Async tools called from the sync path get their own event loop
+        if inspect.isawaitable(result):
+            result = asyncio.run(result)
+        return result
+
+    def _submit_tool(self, tool: Tool, args: dict, on_start: Callable[[], None]) -> Future:
+        """Submit a tool call to the tool pool. ``on_start`` is called once a
+        worker picks it up, so its timeout starts then rather than while it
+        waits behind other calls"""
+        def call():
+            on_start()
+            return self._run_tool(tool, args)
+        return self._get_tool_pool().submit(call)
+
+    def _tool_results_state(self, state: AgentState, pending: List[Tuple[ToolCall, Tool, dict]],
+                            results: list) -> AgentState:
+        """Add one tool message per call, in the original tool_call_id order"""
+        tool_messages = [
+            ToolMessage(
+                content=json.dumps(str(result)), 
+                tool_call_id=call.id, 
+                name=tool.name, 
+            )
+            for (call, tool, _), result in zip(pending, results)
+        ]
         
         # Clear tool calls and add results to messages
         return {
@@ -112,15 +253,76 @@ class Agent:
             "session_id": state["session_id"]
         }
 
-    def _create_state_machine(self) -> StateMachine[AgentState]:
-        """Create the internal state machine for the agent"""
+    def _tool_step(self, state: AgentState) -> AgentState:
+        """Step logic: Execute pending tool calls concurrently on the tool pool"""
+        pending = self._pending_tool_calls(state)
+
+        starts = [_ToolCallStart() for _ in pending]
+        futures = [
+            self._submit_tool(tool, args, start)
+            for (_, tool, args), start in zip(pending, starts)
+        ]
+        for future, start in zip(futures, starts):
+            # Calls cancelled before they start (``close``) are not waited for
+            future.add_done_callback(lambda _, start=start: start())
+
+        results = []
+        for (_, tool, _), future, start in zip(pending, futures, starts):
+            timeout = self._tool_timeout(tool)
+            remaining = None
+            if timeout is not None:
+                start.event.wait()
+                remaining = max(start.time + timeout - time.monotonic(), 0)
+            try:
+                results.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                # A call that is already running cannot be interrupted; it
+                # finishes in the background and its result is dropped
+                future.cancel()
+                results.append(self._timeout_result(tool))
+
+        return self._tool_results_state(state, pending, results)
+
+    async def _atool_step(self, state: AgentState) -> AgentState:
+        """Step logic: Await async tools and pooled sync tools together"""
+        pending = self._pending_tool_calls(state)
+        loop = asyncio.get_running_loop()
+
+        async def run(tool: Tool, args: dict):
+            if tool.is_async:
+                call = tool(**args)
+            else:
+                started = asyncio.Event()
+                call = asyncio.wrap_future(
+                    self._submit_tool(tool, args, lambda: loop.call_soon_threadsafe(started.set))
+                )
+                waiter = asyncio.ensure_future(started.wait())
+                await asyncio.wait([waiter, call], return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+            try:
+                # On timeout the wrapped future is cancelled along with the call
+                return await asyncio.wait_for(call, self._tool_timeout(tool))
+            except asyncio.TimeoutError:
+                return self._timeout_result(tool)
+
+        results = await asyncio.gather(*[run(tool, args) for _, tool, args in pending])
+        return self._tool_results_state(state, pending, list(results))
+
+    def _create_state_machine(self, llm_logic: Callable[[AgentState], AgentState],
+                              tool_logic: Callable[[AgentState], AgentState]) -> StateMachine[AgentState]:
+        """Create the internal state machine for the agent
+        
+        Args:
+            llm_logic: Step logic used for the LLM step (sync or async)
+            tool_logic: Step logic used for the tool step (sync or async)
+        """
         machine = StateMachine[AgentState](AgentState)
         
         # Create steps
         entry = EntryPoint[AgentState]()
         message_prep = Step[AgentState]("message_prep", self._prepare_messages_step)
-        llm_processor = Step[AgentState]("llm_processor", self._llm_step)
-        tool_executor = Step[AgentState]("tool_executor", self._tool_step)
+        llm_processor = Step[AgentState]("llm_processor", llm_logic)
+        tool_executor = Step[AgentState]("tool_executor", tool_logic)
         termination = Termination[AgentState]()
         
         machine.add_steps([entry, message_prep, llm_processor, tool_executor, termination])
@@ -141,60 +343,121 @@ class Agent:
         
         return machine
 
-    def invoke(self, query: str, session_id: Optional[str] = None) -> Run:
-        """
-        Run the agent on a query
-        
-        Args:
-            query: The user's query to process
-            session_id: Optional session identifier (uses "default" if None)
-            
-        Returns:
-            The final run object after processing
-        """
-        session_id = session_id or "default"
-
-        # Create session if it doesn't exist
-        self.memory.create_session(session_id)
+    def _build_initial_state(self, query: str, session_id: str) -> AgentState:
+        """Create the session if needed and seed the state with its last messages"""
+        if self.run_store:
+            last_run: Run = self.run_store.get_last_run(session_id)
+        else:
+            # Create session if it doesn't exist
+            self.memory.create_session(session_id)
+            last_run: Run = self.memory.get_last_object(session_id)
 
         # Get previous messages from last run if available
         previous_messages = []
-        last_run: Run = self.memory.get_last_object(session_id)
         if last_run:
             last_state = last_run.get_final_state()
             if last_state:
                 previous_messages = last_state["messages"]
 
-        initial_state: AgentState = {
+        return {
             "user_query": query,
             "instructions": self.instructions,
             "messages": previous_messages,
             "current_tool_calls": None,
+            "context_tokens_saved": 0,
             "session_id": session_id,
         }
 
-        run_object = self.workflow.run(initial_state)
+    def _snapshot_writer(self, session_id: str):
+        """Stream snapshots to the run store while the workflow runs"""
+        return self.run_store.snapshot_writer(session_id) if self.run_store else None
+
+    def _store_run(self, run_object: Run, session_id: str):
+        if self.run_store:
+            self.run_store.complete_run(session_id, run_object)
+        else:
+            # Store the complete run object in memory
+            self.memory.add(run_object, session_id)
+
+    def invoke(self, query: str, session_id: Optional[str] = None,
+               on_token: Optional[TokenCallback] = None) -> Run:
+        """
+        Run the agent on a query
+        
+        Args:
+            query: The user's query to process
+            session_id: Optional session identifier (uses "default" if None)
+            on_token: Optional callback receiving the LLM's content deltas as
+                they are generated, e.g. to render the answer incrementally
+            
+        Returns:
+            The final run object after processing
+        """
+        session_id = session_id or "default"
+        initial_state = self._build_initial_state(query, session_id)
+
+        run_object = self.workflow.run(
+            initial_state,
+            resource=Resource(vars={"on_token": on_token}),
+            on_snapshot=self._snapshot_writer(session_id),
+        )
+        self._store_run(run_object, session_id)
+        
+        return run_object
+
+    async def ainvoke(self, query: str, session_id: Optional[str] = None,
+                      on_token: Optional[TokenCallback] = None) -> Run:
+        """
+        Run the agent on a query without blocking the event loop
         
-        # Store the complete run object in memory
-        self.memory.add(run_object, session_id)
+        Args:
+            query: The user's query to process
+            session_id: Optional session identifier (uses "default" if None)
+            on_token: Optional callback receiving the LLM's content deltas as
+                they are generated, e.g. to render the answer incrementally
+            
+        Returns:
+            The final run object after processing
+        """
+        session_id = session_id or "default"
+        initial_state = self._build_initial_state(query, session_id)
+
+        run_object = await self.async_workflow.arun(
+            initial_state,
+            resource=Resource(vars={"on_token": on_token}),
+            on_snapshot=self._snapshot_writer(session_id),
+        )
+        self._store_run(run_object, session_id)
         
         return run_object
 
-    def get_session_runs(self, session_id: Optional[str] = None) -> List[Run]:
-        """Get all Run objects for a session
+    def get_session_runs(self, session_id: Optional[str] = None,
+                         offset: int = 0, limit: Optional[int] = None) -> List[Run]:
+        """Get the Run objects for a session, oldest first
         
         Args:
             session_id: Optional session ID (uses "default" if None)
+            offset: Number of runs to skip (default: 0)
+            limit: Maximum number of runs to return (default: all)
             
         Returns:
-            List of Run objects in the session
+            List of Run objects in the session. With a run store, only the
+            requested page is loaded from disk
         """
-        return self.memory.get_all_objects(session_id)
+        if self.run_store:
+            return self.run_store.get_runs(session_id or "default", offset=offset, limit=limit)
+        runs = self.memory.get_all_objects(session_id)
+        return runs[offset:] if limit is None else runs[offset:offset + limit]
 
     def reset_session(self, session_id: Optional[str] = None):
         """Reset memory for a specific session
         
         Args:
-            session_id: Optional session to reset (uses "default" if None)
+            session_id: Optional session to reset (resets all sessions if None)
         """
-        self.memory.reset(session_id)
+        if self.run_store:
+            session_ids = [session_id] if session_id else self.run_store.get_sessions()
+            for sid in session_ids:
+                self.run_store.delete_session(sid)
+        else:
+            self.memory.reset(session_id)
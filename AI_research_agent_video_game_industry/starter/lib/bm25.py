@@ -0,0 +1,131 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter, defaultdict
+import heapq
+import math
+import re
+import threading
+import unicodedata
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens with accents folded (so "Pokemon" matches "Pokémon")"""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return _TOKEN.findall(folded)
+
+
+class BM25Index:
+    """
+    In-memory inverted index scored with Okapi BM25.
+
+    Kept next to a VectorStore so exact terms (titles, publishers, years)
+    can be matched lexically without an embedding call. Documents can be
+    added, replaced and removed incrementally.
+
+    Args:
+        k1: Term frequency saturation
+        b: Document length normalization
+
+    Example:
+        >>> index = BM25Index()
+        >>> index.add("001", "[PlayStation 1] Gran Turismo (1997) - A realistic racing simulator")
+        >>> index.search("gran turismo", n_results=3)
+        [('001', 1.89...)]
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Counter] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id: str, text: str):
+        """Index a document, replacing any previous version with the same id"""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            self._doc_terms[doc_id] = terms
+            self._lengths[doc_id] = sum(terms.values())
+            self._total_length += self._lengths[doc_id]
+            for term, frequency in terms.items():
+                self._postings[term][doc_id] = frequency
+
+    def add_many(self, items: Iterable[Tuple[str, str]]):
+        for doc_id, text in items:
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, n_results: int = 10,
+               candidates: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Rank documents for ``query``.
+
+        Args:
+            query: Free-text query
+            n_results: Maximum number of results
+            candidates: Optional ids to restrict the search to
+
+        Returns:
+            (doc_id, score) pairs, best first; documents sharing no term
+            with the query are not returned
+        """
+        allowed = set(candidates) if candidates is not None else None
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs:
+                return []
+            average_length = self._total_length / n_docs
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(n_results, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], weights: Optional[List[float]] = None,
+                           k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked id lists: each list contributes ``weight / (k + rank)`` per id.
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
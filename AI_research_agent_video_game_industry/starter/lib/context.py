@@ -0,0 +1,163 @@
+from typing import Callable, List, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import threading
+
+from lib.llm import LLM
+from lib.messages import BaseMessage, AIMessage, SystemMessage, UserMessage
+
+
+Tokenizer = Callable[[str], int]
+Summarizer = Callable[[List[BaseMessage], Optional[str]], str]
+
+
+def approximate_token_count(text: str) -> int:
+    """Cheap tokenizer: roughly 4 characters per token for English text"""
+    return (len(text) + 3) // 4
+
+
+class LLMSummarizer:
+    """
+    Summarizer that asks an LLM to fold older turns into a running summary.
+
+    Args:
+        llm: LLM used to write the summaries
+        max_words: Target length of the summary
+    """
+    def __init__(self, llm: LLM, max_words: int = 150):
+        self.llm = llm
+        self.max_words = max_words
+
+    def __call__(self, messages: List[BaseMessage], previous_summary: Optional[str] = None) -> str:
+        transcript = "\n".join(
+            f"{m.role}: {m.content or ''}" for m in messages if m.content
+        )
+        prompt = (
+            f"Update the summary of a conversation in at most {self.max_words} words. "
+            "Keep names, numbers and decisions the assistant may need later."
+            f"\n# Current summary: \n-> {previous_summary or 'None'} "
+            f"\n# New messages: \n{transcript} "
+            "\n# Updated summary: "
+        )
+        return self.llm.invoke([UserMessage(content=prompt)]).content or ""
+
+
+class ContextManager:
+    """
+    Keep the prompt sent to the LLM within a token budget.
+
+    The first system message (the instructions) is always kept. The rest of
+    the conversation is split into turns, each starting at a user message, so
+    an assistant tool call always stays together with its tool results. The
+    most recent turns that fit in ``max_tokens`` are kept verbatim (the
+    current turn is always kept); older turns are dropped, or rolled into a
+    summary message when a summarizer is configured. Summaries are cached by
+    a hash chain over the summarized messages, so each new turn only
+    summarizes what newly fell out of the window.
+
+    Example:
+        >>> context = ContextManager(max_tokens=2000, summarizer=LLMSummarizer(llm))
+        >>> agent = Agent("gpt-4o-mini", "You are helpful", context_manager=context)
+    """
+    def __init__(self,
+                 max_tokens: int = 4000,
+                 tokenizer: Optional[Tokenizer] = None,
+                 summarizer: Optional[Summarizer] = None,
+                 max_cached_summaries: int = 256):
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer or approximate_token_count
+        self.summarizer = summarizer
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count_tokens(self, message: BaseMessage) -> int:
+        """Count the tokens of a message, including its tool call arguments"""
+        tokens = self.tokenizer(message.content or "")
+        if isinstance(message, AIMessage) and message.tool_calls:
+            for call in message.tool_calls:
+                tokens += self.tokenizer(call.function.name + call.function.arguments)
+        return tokens
+
+    def _split_turns(self, messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+        turns: List[List[BaseMessage]] = []
+        for message in messages:
+            if isinstance(message, UserMessage) or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    def _message_key(self, message: BaseMessage) -> bytes:
+        calls = ""
+        if isinstance(message, AIMessage) and message.tool_calls:
+            calls = "".join(c.id for c in message.tool_calls)
+        return f"{message.role}\0{message.content or ''}\0{calls}".encode()
+
+    def _summarize(self, messages: List[BaseMessage]) -> str:
+        """Summarize ``messages``, resuming from the longest cached prefix"""
+        digests = []
+        digest = b""
+        for message in messages:
+            digest = hashlib.sha256(digest + self._message_key(message)).digest()
+            digests.append(digest.hex())
+
+        with self._lock:
+            start, summary = 0, None
+            for index in range(len(digests) - 1, -1, -1):
+                if digests[index] in self._summaries:
+                    start, summary = index + 1, self._summaries[digests[index]]
+                    self._summaries.move_to_end(digests[index])
+                    break
+
+        if start < len(messages):
+            summary = self.summarizer(messages[start:], summary)
+            with self._lock:
+                self._summaries[digests[-1]] = summary
+                while len(self._summaries) > self.max_cached_summaries:
+                    self._summaries.popitem(last=False)
+        return summary
+
+    def prepare(self, messages: List[BaseMessage]) -> Tuple[List[BaseMessage], int]:
+        """
+        Build the messages to send to the LLM.
+
+        Args:
+            messages: Full conversation history
+
+        Returns:
+            The windowed messages and the number of tokens saved compared to
+            sending the full history
+        """
+        if not messages:
+            return list(messages), 0
+
+        head: List[BaseMessage] = []
+        rest = list(messages)
+        if isinstance(rest[0], SystemMessage):
+            head, rest = rest[:1], rest[1:]
+
+        turns = self._split_turns(rest)
+        turn_tokens = [sum(self.count_tokens(m) for m in turn) for turn in turns]
+        full_tokens = sum(self.count_tokens(m) for m in head) + sum(turn_tokens)
+        if full_tokens <= self.max_tokens:
+            return list(messages), 0
+
+        budget = self.max_tokens - sum(self.count_tokens(m) for m in head)
+        kept = 0
+        used = 0
+        # Walk turns from newest to oldest; the current turn is always kept
+        for tokens in reversed(turn_tokens):
+            if kept and used + tokens > budget:
+                break
+            used += tokens
+            kept += 1
+
+        dropped = [m for turn in turns[:len(turns) - kept] for m in turn]
+        window = [m for turn in turns[len(turns) - kept:] for m in turn]
+        if dropped and self.summarizer:
+            summary = self._summarize(dropped)
+            head = head + [SystemMessage(content=f"Summary of the earlier conversation: {summary}")]
+
+        prepared = head + window
+        saved = full_tokens - sum(self.count_tokens(m) for m in prepared)
+        return prepared, max(saved, 0)
@@ -1,14 +1,21 @@
-from typing import List, Dict, Any, Optional
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
+import hashlib
+import re
 import uuid
+from collections import deque
 from collections.abc import MutableSequence
 
+from lib.context import approximate_token_count
+
 
 @dataclass
 class Document:
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
     content: str = field(default_factory=str)
     metadata: Dict[str, Any] = None
+    # Precomputed embedding, written as-is instead of embedding the content
+    embedding: Optional[List[float]] = None
 
 class Corpus(MutableSequence):
     def __init__(self, documents: Optional[List[Document]] = None):
@@ -47,6 +54,7 @@ class Corpus(MutableSequence):
                 - 'contents': List of all document content strings
                 - 'metadatas': List of all document metadata dictionaries
                 - 'ids': List of all document ID strings
+                - 'embeddings': List of precomputed embeddings (None where absent)
                 
         Example:
             >>> corpus = Corpus([doc1, doc2])
@@ -60,12 +68,139 @@ class Corpus(MutableSequence):
         
         # Use zip with unpacking to efficiently extract all fields
         # Handle empty corpus case by providing empty defaults
-        contents, metadatas, ids = zip(*(
-            (doc.content, doc.metadata, doc.id) for doc in self._documents
-        )) if self._documents else ([], [], [])
+        contents, metadatas, ids, embeddings = zip(*(
+            (doc.content, doc.metadata, doc.id, doc.embedding) for doc in self._documents
+        )) if self._documents else ([], [], [], [])
 
         return {
             'contents': list(contents),
             'metadatas': list(metadatas),
-            'ids': list(ids)
+            'ids': list(ids),
+            'embeddings': list(embeddings),
         }
+
+
+Span = Tuple[int, int]
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+_WORD = re.compile(r"\S+")
+
+
+class Chunker:
+    """
+    Split documents into overlapping, token-bounded chunks.
+
+    Text is cut at paragraph and sentence boundaries; only a sentence that
+    alone exceeds ``chunk_size`` is cut between words. Consecutive sentences
+    are packed into chunks of at most ``chunk_size`` tokens, and each chunk
+    repeats up to ``chunk_overlap`` tokens of trailing sentences from the one
+    before it. Chunk text is an exact slice of the source text. Chunks are
+    produced lazily, so a generator of pages can be chunked and embedded
+    without holding the corpus in memory.
+
+    Each chunk keeps the parent's metadata plus provenance: ``parent_id``,
+    ``chunk_index``, ``start_char`` and ``end_char``. Chunk ids combine the
+    parent id, the index and a hash of the chunk text, so re-chunking with
+    other settings gives changed chunks new ids.
+
+    Args:
+        chunk_size: Maximum tokens per chunk
+        chunk_overlap: Maximum tokens repeated from the previous chunk
+        tokenizer: Token counter (default: ~4 characters per token)
+
+    Example:
+        >>> chunker = Chunker(chunk_size=256, chunk_overlap=32)
+        >>> store.add(chunker.chunk(PDFLoader("report.pdf").iter_documents()))
+    """
+
+    def __init__(self,
+                 chunk_size: int = 512,
+                 chunk_overlap: int = 64,
+                 tokenizer: Optional[Callable[[str], int]] = None):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.tokenizer = tokenizer or approximate_token_count
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the chunking settings, so ingests can tell when they changed"""
+        tokenizer = getattr(self.tokenizer, "__qualname__", type(self.tokenizer).__name__)
+        return f"size={self.chunk_size},overlap={self.chunk_overlap},tokenizer={tokenizer}"
+
+    def _units(self, text: str) -> Iterator[Tuple[Span, int]]:
+        """Yield (span, tokens) of the sentences of ``text``, in order"""
+        for paragraph in self._split(text, 0, len(text), _PARAGRAPH_BREAK):
+            for start, end in self._split(text, *paragraph, _SENTENCE_END):
+                tokens = self.tokenizer(text[start:end])
+                if tokens <= self.chunk_size:
+                    yield (start, end), tokens
+                else:
+                    yield from self._split_words(text, start, end)
+
+    @staticmethod
+    def _split(text: str, start: int, end: int, separator: re.Pattern) -> Iterator[Span]:
+        position = start
+        for match in separator.finditer(text, start, end):
+            if text[position:match.start()].strip():
+                yield position, match.start()
+            position = match.end()
+        if text[position:end].strip():
+            yield position, end
+
+    def _split_words(self, text: str, start: int, end: int) -> Iterator[Tuple[Span, int]]:
+        """Cut an oversized sentence into pieces of at most ``chunk_size`` tokens"""
+        piece_start = None
+        piece_end = start
+        for word in _WORD.finditer(text, start, end):
+            if piece_start is not None and self.tokenizer(text[piece_start:word.end()]) > self.chunk_size:
+                yield (piece_start, piece_end), self.tokenizer(text[piece_start:piece_end])
+                piece_start = None
+            if piece_start is None:
+                piece_start = word.start()
+            piece_end = word.end()
+        if piece_start is not None:
+            yield (piece_start, piece_end), self.tokenizer(text[piece_start:piece_end])
+
+    def split_text(self, text: str) -> Iterator[Span]:
+        """Yield the (start, end) character spans of the chunks of ``text``"""
+        window: deque = deque()
+        window_tokens = 0
+        has_new = False
+
+        for span, tokens in self._units(text):
+            if window and window_tokens + tokens > self.chunk_size:
+                yield window[0][0][0], window[-1][0][1]
+                has_new = False
+                # Carry trailing sentences over as overlap
+                while window and (window_tokens > self.chunk_overlap
+                                  or window_tokens + tokens > self.chunk_size):
+                    window_tokens -= window.popleft()[1]
+            window.append((span, tokens))
+            window_tokens += tokens
+            has_new = True
+
+        if has_new:
+            yield window[0][0][0], window[-1][0][1]
+
+    def chunk(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Lazily split each document into chunk Documents with provenance metadata"""
+        if isinstance(documents, Document):
+            documents = [documents]
+        for document in documents:
+            for index, (start, end) in enumerate(self.split_text(document.content)):
+                content = document.content[start:end]
+                digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                yield Document(
+                    id=f"{document.id}-c{index}-{digest[:12]}",
+                    content=content,
+                    metadata={
+                        **(document.metadata or {}),
+                        "parent_id": document.id,
+                        "chunk_index": index,
+                        "start_char": start,
+                        "end_char": end,
+                    }
+                )
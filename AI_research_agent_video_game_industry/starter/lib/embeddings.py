@@ -0,0 +1,140 @@
+from typing import Any, Dict, List, Optional
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings, Space
+from chromadb.utils.embedding_functions import config_to_embedding_function, register_embedding_function
+
+from lib.llm_cache import CacheStats
+
+
+@register_embedding_function
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Embedding function wrapper that never embeds the same text twice.
+
+    Vectors are stored in SQLite keyed by (model, sha256(text)). Each call
+    looks up all of its texts in batched queries and only sends the misses
+    (de-duplicated) to the wrapped embedding function, so re-ingesting an
+    unchanged corpus makes no embedding calls at all. Use ``":memory:"`` as
+    path for a cache that lives only as long as the process.
+
+    The wrapper is registered with Chroma as "cached" and its config holds
+    the wrapped function's, so a persisted collection reopens with the same
+    cached embedding function.
+
+    Args:
+        embedding_function: Embedding function to wrap, e.g. OpenAIEmbeddingFunction
+        path: SQLite file holding the vectors
+        model_name: Cache namespace; defaults to the wrapped function's model
+
+    Example:
+        >>> openai_ef = embedding_functions.OpenAIEmbeddingFunction(api_key=key)
+        >>> embedding_fn = CachedEmbeddingFunction(openai_ef, "embeddings.sqlite3")
+        >>> embedding_fn(["Elden Ring", "Dark Souls"])
+        >>> embedding_fn.stats.hit_ratio
+    """
+    # SQLite's default limit on host parameters is 999
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self,
+                 embedding_function: EmbeddingFunction[Documents],
+                 path: str = "embeddings.sqlite3",
+                 model_name: Optional[str] = None):
+        self.embedding_function = embedding_function
+        self.path = path
+        if model_name is None:
+            model_name = getattr(embedding_function, "model_name", type(embedding_function).__name__)
+            dimensions = getattr(embedding_function, "dimensions", None)
+            if dimensions:
+                model_name = f"{model_name}:{dimensions}"
+        self.model_name = model_name
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, digest TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, digest))"
+        )
+        self._conn.commit()
+
+    def __repr__(self):
+        return f"CachedEmbeddingFunction({self.model_name!r}, path={self.path!r})"
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, digests: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        for start in range(0, len(digests), self.LOOKUP_BATCH_SIZE):
+            batch = digests[start:start + self.LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT digest, vector FROM embeddings WHERE model = ? AND digest IN ({placeholders})",
+                (self.model_name, *batch),
+            ).fetchall()
+            for digest, vector in rows:
+                found[digest] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def __call__(self, input: Documents) -> Embeddings:
+        digests = [self._digest(text) for text in input]
+        unique = list(dict.fromkeys(digests))
+
+        with self._lock:
+            vectors = self._lookup(unique)
+
+        missing = [digest for digest in unique if digest not in vectors]
+        if missing:
+            text_by_digest = dict(zip(digests, input))
+            embedded = self.embedding_function([text_by_digest[d] for d in missing])
+            new_vectors = {d: np.asarray(v, dtype=np.float32) for d, v in zip(missing, embedded)}
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                    [(self.model_name, d, v.tobytes()) for d, v in new_vectors.items()],
+                )
+                self._conn.commit()
+            vectors.update(new_vectors)
+
+        with self._lock:
+            self.stats.misses += len(missing)
+            self.stats.hits += len(digests) - len(missing)
+        return [vectors[digest] for digest in digests]
+
+    @staticmethod
+    def name() -> str:
+        return "cached"
+
+    def get_config(self) -> Dict[str, Any]:
+        """Chroma persists this with a collection, so the collection can be
+        reopened (with its cache) without passing the embedding function"""
+        wrapped = self.embedding_function
+        if not isinstance(wrapped, EmbeddingFunction) or wrapped.is_legacy():
+            return NotImplemented
+        return {
+            "path": self.path,
+            "model_name": self.model_name,
+            "embedding_function": {"name": wrapped.name(), "config": wrapped.get_config()},
+        }
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "CachedEmbeddingFunction":
+        return CachedEmbeddingFunction(
+            config_to_embedding_function(config["embedding_function"]),
+            path=config["path"],
+            model_name=config["model_name"],
+        )
+
+    def default_space(self) -> Space:
+        return self.embedding_function.default_space()
+
+    def supported_spaces(self) -> List[Space]:
+        return self.embedding_function.supported_spaces()
+
+    def close(self):
+        self._conn.close()
@@ -5,6 +5,7 @@ from pydantic import BaseModel, Field
 from lib.agents import AgentState
 from lib.state_machine import Run
 from lib.llm import LLM
+from lib.llm_cache import ResponseCache
 from lib.messages import AIMessage, BaseMessage
 from lib.parsers import PydanticOutputParser
 
@@ -64,8 +65,10 @@ class JudgeEvaluation(BaseModel):
 class AgentEvaluator:
     """Comprehensive agent evaluation framework"""
     
-    def __init__(self):
-        self.llm_judge = LLM(model="gpt-4o-mini")
+    def __init__(self, cache: Optional[ResponseCache] = None):
+        # The judge runs at temperature 0, so a cache makes re-runs of the
+        # same test cases nearly free
+        self.llm_judge = LLM(model="gpt-4o-mini", cache=cache)
     
     def evaluate_final_response(self, 
                           test_case: TestCase, 
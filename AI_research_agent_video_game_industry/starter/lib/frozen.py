@@ -0,0 +1,284 @@
+from typing import Any
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is immutable (shared by snapshots or caches); copy it first")
+
+
+class FrozenList(list):
+    """Immutable list used for state values captured in snapshots and other
+    shared values such as tool schemas.
+
+    It is still a ``list`` (so ``isinstance`` checks and JSON encoding keep
+    working), but in-place mutation raises. Concatenation returns a new
+    FrozenList sharing the existing items, so ``state["messages"] + [msg]``
+    only freezes the appended items.
+    """
+    append = extend = insert = remove = pop = clear = sort = reverse = _immutable
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+
+    def __add__(self, other):
+        return FrozenList(list.__add__(self, [freeze(item) for item in other]))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+class FrozenDict(dict):
+    """Immutable dict used for state values captured in snapshots and other
+    shared values such as tool schemas.
+
+    ``copy()`` returns a plain, mutable dict.
+    """
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    update = pop = popitem = clear = setdefault = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class ThawedList(list):
+    """Mutable copy of a FrozenList, made in a single C-level copy.
+
+    Nested frozen containers are only thawed when read, and the copy tracks
+    how many leading items are still those of ``base``, so freezing it after
+    appends only freezes the new items instead of walking the whole list.
+    """
+    __slots__ = ("base", "shared")
+
+    def __init__(self, base: FrozenList):
+        list.__init__(self, base)
+        self.base = base
+        # Leading items known to be the very items of ``base``
+        self.shared = len(base)
+
+    def _touch(self, index: int = 0):
+        self.shared = min(self.shared, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        item = list.__getitem__(self, index)
+        if isinstance(item, (FrozenList, FrozenDict)):
+            position = index if index >= 0 else index + len(self)
+            item = lazy_thaw(item)
+            list.__setitem__(self, position, item)
+            self._touch(position)
+        return item
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __add__(self, other):
+        result = ThawedList.__new__(ThawedList)
+        list.__init__(result, list.__add__(self, other))
+        result.base, result.shared = self.base, self.shared
+        return result
+
+    def __setitem__(self, index, value):
+        self._touch(index if isinstance(index, int) and index >= 0 else 0)
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        self._touch(index if isinstance(index, int) and index >= 0 else 0)
+        list.__delitem__(self, index)
+
+    def insert(self, index, value):
+        self._touch(max(index, 0))
+        list.insert(self, index, value)
+
+    def pop(self, index=-1):
+        self._touch(index if index >= 0 else index + len(self))
+        return list.pop(self, index)
+
+    def remove(self, value):
+        self._touch()
+        list.remove(self, value)
+
+    def clear(self):
+        self._touch()
+        list.clear(self)
+
+    def sort(self, *args, **kwargs):
+        self._touch()
+        list.sort(self, *args, **kwargs)
+
+    def reverse(self):
+        self._touch()
+        list.reverse(self)
+
+    def __imul__(self, count):
+        self._touch()
+        return list.__imul__(self, count)
+
+    def __reduce__(self):
+        return (list, (thaw(self),))
+
+
+class ThawedDict(dict):
+    """Mutable copy of a FrozenDict whose nested frozen containers are only
+    thawed when read.
+
+    The keys read or written are tracked, so freezing it only revisits those
+    and returns ``base`` itself when none of them changed.
+    """
+    __slots__ = ("base", "touched")
+
+    def __init__(self, base: FrozenDict):
+        dict.__init__(self, base)
+        self.base = base
+        self.touched = set()
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, (FrozenList, FrozenDict)):
+            value = lazy_thaw(value)
+            dict.__setitem__(self, key, value)
+            self.touched.add(key)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        for key in list(dict.keys(self)):
+            self[key]
+        return dict.values(self)
+
+    def items(self):
+        self.values()
+        return dict.items(self)
+
+    def __setitem__(self, key, value):
+        self.touched.add(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self.touched.add(key)
+        dict.__delitem__(self, key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        self.touched.add(key)
+        return lazy_thaw(dict.pop(self, key, *default))
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self.touched.add(key)
+        return key, lazy_thaw(value)
+
+    def clear(self):
+        self.touched.update(dict.keys(self))
+        dict.clear(self)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        return (dict, (thaw(self),))
+
+
+def freeze(value: Any, previous: Any = None) -> Any:
+    """Recursively convert lists and dicts to their frozen counterparts.
+
+    Values that are already frozen are returned as-is, so unchanged fields
+    are shared between snapshots instead of being copied. Other objects
+    (e.g. messages) are shared by reference and treated as immutable.
+
+    Args:
+        value: Value to freeze
+        previous: Frozen value ``value`` was thawed from, if any. Containers
+            whose items are all unchanged are replaced by it, so a thawed
+            state that a step did not modify freezes back to the shared one.
+    """
+    if isinstance(value, (FrozenList, FrozenDict)):
+        return value
+    if isinstance(value, ThawedList):
+        # Only the items after the untouched prefix need freezing
+        base, shared = value.base, value.shared
+        tail = [
+            freeze(item, base[shared + i] if shared + i < len(base) else None)
+            for i, item in enumerate(list.__getitem__(value, slice(shared, None)))
+        ]
+        if len(value) == len(base) and all(a is b for a, b in zip(tail, list.__getitem__(base, slice(shared, None)))):
+            return base
+        items = list.__getitem__(base, slice(0, shared))
+        items += tail
+        return FrozenList(items)
+    if isinstance(value, ThawedDict):
+        base = value.base
+        if not value.touched:
+            return base
+        items = dict(base)
+        for key in value.touched:
+            if key in value:
+                items[key] = freeze(dict.__getitem__(value, key), base.get(key))
+            else:
+                items.pop(key, None)
+        if len(items) == len(base) and all(key in base and items[key] is base[key] for key in value.touched):
+            return base
+        return FrozenDict(items)
+    if isinstance(value, list):
+        old = previous if isinstance(previous, FrozenList) else ()
+        items = [freeze(item, old[i] if i < len(old) else None) for i, item in enumerate(value)]
+        if isinstance(previous, FrozenList) and len(items) == len(old) and all(a is b for a, b in zip(items, old)):
+            return previous
+        return FrozenList(items)
+    if isinstance(value, dict):
+        old = previous if isinstance(previous, FrozenDict) else {}
+        items = {key: freeze(item, old.get(key)) for key, item in value.items()}
+        if isinstance(previous, FrozenDict) and items.keys() == old.keys() and all(items[k] is old[k] for k in items):
+            return previous
+        return FrozenDict(items)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Recursively copy frozen lists and dicts into plain, mutable ones.
+
+    Only the containers are copied, other objects are shared with the
+    snapshot. See ``lazy_thaw`` for the copy steps receive.
+    """
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    return value
+
+
+def lazy_thaw(value: Any) -> Any:
+    """Mutable copy of a frozen value whose nested containers are thawed on
+    first read.
+
+    Steps receive their state this way, so they can update it in place while
+    the cost of the copy (and of freezing it back) depends on what the step
+    touches rather than on the size of the state. Values that are not frozen
+    are copied with ``thaw``.
+    """
+    if isinstance(value, FrozenList):
+        return ThawedList(value)
+    if isinstance(value, FrozenDict):
+        return ThawedDict(value)
+    return thaw(value)
@@ -1,7 +1,23 @@
 import os
-from typing import List, Optional, Dict, Any
+import asyncio
+import copy
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, Dict, Any, Tuple
+import httpx
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    DefaultHttpxClient,
+    DefaultAsyncHttpxClient,
+    APIConnectionError,
+    APIStatusError,
+    RateLimitError,
+)
 from lib.messages import (
     AnyMessage,
     TokenUsage,
@@ -9,7 +25,174 @@ from lib.messages import (
     BaseMessage,
     UserMessage,
 )
-from lib.tooling import Tool
+from lib.tooling import Tool, ToolCall
+from lib.llm_cache import ResponseCache, request_key
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+
+DEFAULT_POOL_SIZE = 20
+
+ClientKey = Tuple[str, Optional[str], int]
+
+_clients: Dict[ClientKey, OpenAI] = {}
+# Async connections are bound to the event loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def _pool_limits(pool_size: int) -> httpx.Limits:
+    return httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+
+
+def get_client(api_key: str, base_url: Optional[str] = None,
+               pool_size: int = DEFAULT_POOL_SIZE) -> OpenAI:
+    """
+    Get the shared OpenAI client for (api_key, base_url, pool_size).
+
+    Clients are thread-safe and keep their HTTP connections alive, so
+    sharing one per endpoint avoids a new connection pool (and TLS
+    handshake) for every LLM instance.
+    """
+    key = (api_key, base_url, pool_size)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=DefaultHttpxClient(limits=_pool_limits(pool_size)),
+            )
+            _clients[key] = client
+        return client
+
+
+def get_async_client(api_key: str, base_url: Optional[str] = None,
+                     pool_size: int = DEFAULT_POOL_SIZE) -> AsyncOpenAI:
+    """
+    Get the shared AsyncOpenAI client for the running event loop.
+
+    Outside of a running loop a new, unshared client is returned.
+    """
+    def create() -> AsyncOpenAI:
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=DefaultAsyncHttpxClient(limits=_pool_limits(pool_size)),
+        )
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return create()
+
+    key = (api_key, base_url, pool_size)
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = create()
+            clients[key] = client
+        return client
+
+
+TokenCallback = Callable[[str], None]
+
+
+class LLMStream:
+    """
+    Iterator over the content deltas of a streamed chat completion.
+
+    Tool-call fragments are assembled as they arrive. Once the stream is
+    exhausted, ``message`` holds the complete AIMessage (with token usage)
+    and ``time_to_first_token`` the seconds from the request to the first
+    delta.
+
+    Example:
+        >>> stream = llm.stream("Who made Dark Souls 3?")
+        >>> for delta in stream:
+        ...     print(delta, end="", flush=True)
+        >>> stream.message.content, stream.time_to_first_token
+    """
+    def __init__(self, chunks: Iterable[Any], started: float):
+        self._chunks = chunks
+        self.started = started
+        self.time_to_first_token: Optional[float] = None
+        self.message: Optional[AIMessage] = None
+        self._content: List[str] = []
+        self._tool_calls: Dict[int, Dict[str, str]] = {}
+        self._token_usage: Optional[TokenUsage] = None
+
+    def _consume(self, chunk: Any) -> Optional[str]:
+        """Accumulate a chunk and return its content delta, if any"""
+        if chunk.usage:
+            self._token_usage = TokenUsage(
+                prompt_tokens=chunk.usage.prompt_tokens,
+                completion_tokens=chunk.usage.completion_tokens,
+                total_tokens=chunk.usage.total_tokens
+            )
+        if not chunk.choices:
+            return None
+
+        delta = chunk.choices[0].delta
+        if self.time_to_first_token is None and (delta.content or delta.tool_calls):
+            self.time_to_first_token = time.perf_counter() - self.started
+
+        for fragment in delta.tool_calls or []:
+            call = self._tool_calls.setdefault(fragment.index, {"id": "", "name": "", "arguments": ""})
+            if fragment.id:
+                call["id"] = fragment.id
+            if fragment.function:
+                call["name"] += fragment.function.name or ""
+                call["arguments"] += fragment.function.arguments or ""
+
+        if delta.content:
+            self._content.append(delta.content)
+        return delta.content
+
+    def _finish(self):
+        tool_calls = [
+            ToolCall(
+                id=call["id"],
+                type="function",
+                function=Function(name=call["name"], arguments=call["arguments"]),
+            )
+            for _, call in sorted(self._tool_calls.items())
+        ]
+        self.message = AIMessage(
+            content="".join(self._content) if self._content else None,
+            tool_calls=tool_calls or None,
+            token_usage=self._token_usage
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            content = self._consume(chunk)
+            if content:
+                yield content
+        self._finish()
+
+    def collect(self, on_token: Optional[TokenCallback] = None) -> AIMessage:
+        """Consume the stream, passing each delta to ``on_token``, and return the message"""
+        for content in self:
+            if on_token:
+                on_token(content)
+        return self.message
+
+
+class AsyncLLMStream(LLMStream):
+    """Async counterpart of LLMStream, consumed with ``async for``"""
+    async def __aiter__(self) -> AsyncIterator[str]:
+        async for chunk in self._chunks:
+            content = self._consume(chunk)
+            if content:
+                yield content
+        self._finish()
+
+    async def collect(self, on_token: Optional[TokenCallback] = None) -> AIMessage:
+        async for content in self:
+            if on_token:
+                on_token(content)
+        return self.message
 
 
 class LLM:
@@ -20,6 +203,8 @@ class LLM:
         tools: Optional[List[Tool]] = None,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        cache: Optional[ResponseCache] = None,
     ):
         self.model = model
         self.temperature = temperature
@@ -31,17 +216,29 @@ class LLM:
                 "Missing OpenAI API key. Set OPENAI_API_KEY or pass api_key explicitly."
             )
 
-        client_kwargs: Dict[str, Any] = {"api_key": resolved_api_key}
-        if resolved_base_url:
-            client_kwargs["base_url"] = resolved_base_url
-
-        self.client = OpenAI(**client_kwargs)
+        self.api_key = resolved_api_key
+        self.base_url = resolved_base_url or None
+        self.pool_size = pool_size
+        self.cache = cache
+        self._init_client()
         self.tools: Dict[str, Tool] = {
             tool.name: tool for tool in (tools or [])
         }
+        self._tool_schemas: Optional[List[Dict[str, Any]]] = None
+
+    def _init_client(self):
+        self.client = get_client(self.api_key, self.base_url, self.pool_size)
 
     def register_tool(self, tool: Tool):
         self.tools[tool.name] = tool
+        self._tool_schemas = None
+
+    @property
+    def tool_schemas(self) -> List[Dict[str, Any]]:
+        """JSON schemas of the registered tools, computed once"""
+        if self._tool_schemas is None:
+            self._tool_schemas = [tool.dict() for tool in self.tools.values()]
+        return self._tool_schemas
 
     def _build_payload(self, messages: List[BaseMessage]) -> Dict[str, Any]:
         payload = {
@@ -51,7 +248,7 @@ class LLM:
         }
 
         if self.tools:
-            payload["tools"] = [tool.dict() for tool in self.tools.values()]
+            payload["tools"] = self.tool_schemas
             payload["tool_choice"] = "auto"
 
         return payload
@@ -66,16 +263,16 @@ class LLM:
         else:
             raise ValueError(f"Invalid input type {type(input)}.")
 
-    def invoke(self, 
-               input: str | BaseMessage | List[BaseMessage],
-               response_format: BaseModel = None,) -> AIMessage:
+    def _build_request(self,
+                       input: str | BaseMessage | List[BaseMessage],
+                       response_format: BaseModel = None) -> Dict[str, Any]:
         messages = self._convert_input(input)
         payload = self._build_payload(messages)
         if response_format:
             payload.update({"response_format": response_format})
-            response = self.client.beta.chat.completions.parse(**payload)
-        else:
-            response = self.client.chat.completions.create(**payload)
+        return payload
+
+    def _parse_response(self, response: Any) -> AIMessage:
         choice = response.choices[0]
         message = choice.message
 
@@ -92,3 +289,289 @@ class LLM:
             tool_calls=message.tool_calls,
             token_usage=token_usage
         )
+
+    def _build_stream_request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {**payload, "stream": True, "stream_options": {"include_usage": True}}
+
+    def _cache_lookup(self, payload: Dict[str, Any],
+                      on_token: Optional[TokenCallback] = None) -> Tuple[Optional[str], Optional[AIMessage]]:
+        """Return the cache key of a request (None if not cacheable) and any cached response
+
+        A cached response reports zero token usage, since serving it did not
+        call the API; callers summing ``token_usage`` only count real calls.
+        """
+        if self.cache is None or not self.cache.cacheable(payload):
+            return None, None
+        key = request_key(payload)
+        cached = self.cache.get(key)
+        if cached:
+            cached = cached.model_copy(update={"token_usage": TokenUsage()})
+            if on_token and cached.content:
+                on_token(cached.content)
+        return key, cached
+
+    def stream(self, input: str | BaseMessage | List[BaseMessage]) -> LLMStream:
+        """Start a streamed completion; iterate the result for content deltas"""
+        started = time.perf_counter()
+        payload = self._build_stream_request(self._build_request(input))
+        chunks = self.client.chat.completions.create(**payload)
+        return LLMStream(chunks, started)
+
+    def invoke(self, 
+               input: str | BaseMessage | List[BaseMessage],
+               response_format: BaseModel = None,
+               on_token: Optional[TokenCallback] = None) -> AIMessage:
+        """
+        Get a completion for the input.
+
+        Args:
+            input: Prompt string, message, or list of messages
+            response_format: Optional pydantic model for structured output
+            on_token: Optional callback receiving content deltas as they are
+                generated. Ignored for structured output, which is not streamed
+
+        Returns:
+            The complete AIMessage
+        """
+        payload = self._build_request(input, response_format)
+        key, cached = self._cache_lookup(payload, on_token)
+        if cached:
+            return cached
+
+        if on_token and not response_format:
+            started = time.perf_counter()
+            chunks = self.client.chat.completions.create(**self._build_stream_request(payload))
+            message = LLMStream(chunks, started).collect(on_token)
+        elif response_format:
+            message = self._parse_response(self.client.beta.chat.completions.parse(**payload))
+        else:
+            message = self._parse_response(self.client.chat.completions.create(**payload))
+
+        if key:
+            self.cache.put(key, message)
+        return message
+
+
+class AsyncLLM(LLM):
+    """
+    Async counterpart of LLM built on AsyncOpenAI.
+
+    ``invoke`` is a coroutine, so many concurrent conversations can share a
+    single event loop instead of blocking one thread per request.
+    """
+    def _init_client(self):
+        # The client is resolved per event loop, see `client`
+        pass
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return get_async_client(self.api_key, self.base_url, self.pool_size)
+
+    async def stream(self, input: str | BaseMessage | List[BaseMessage]) -> AsyncLLMStream:
+        started = time.perf_counter()
+        payload = self._build_stream_request(self._build_request(input))
+        chunks = await self.client.chat.completions.create(**payload)
+        return AsyncLLMStream(chunks, started)
+
+    async def invoke(self, 
+                     input: str | BaseMessage | List[BaseMessage],
+                     response_format: BaseModel = None,
+                     on_token: Optional[TokenCallback] = None) -> AIMessage:
+        payload = self._build_request(input, response_format)
+        key, cached = self._cache_lookup(payload, on_token)
+        if cached:
+            return cached
+
+        if on_token and not response_format:
+            started = time.perf_counter()
+            chunks = await self.client.chat.completions.create(**self._build_stream_request(payload))
+            message = await AsyncLLMStream(chunks, started).collect(on_token)
+        elif response_format:
+            message = self._parse_response(await self.client.beta.chat.completions.parse(**payload))
+        else:
+            message = self._parse_response(await self.client.chat.completions.create(**payload))
+
+        if key:
+            self.cache.put(key, message)
+        return message
+
+
+# HTTP statuses worth retrying: timeouts, conflicts, throttling, server errors
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed API call may succeed if retried (network errors,
+    timeouts, rate limits and server errors)"""
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRY_STATUS
+    return isinstance(error, (APIConnectionError, ConnectionError, TimeoutError))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at ``rate_per_minute``.
+
+    ``acquire`` may drive the level negative when a single request is larger
+    than the capacity; later callers then wait until the debt is repaid.
+    """
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0):
+        """Block until ``amount`` is available, then take it"""
+        while True:
+            with self._lock:
+                self._refill()
+                # Oversized requests only wait for a full bucket
+                needed = min(amount, self.capacity)
+                if self._level >= needed:
+                    self._level -= amount
+                    return
+                wait = (needed - self._level) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount: float):
+        """Return (positive) or charge (negative) tokens after the fact"""
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level + amount)
+
+
+class BatchScheduler:
+    """
+    Run many LLM requests concurrently within provider rate limits.
+
+    Requests-per-minute and tokens-per-minute budgets are enforced with
+    token buckets. Each request reserves its estimated prompt tokens plus
+    ``expected_completion_tokens`` up front, and the estimate is reconciled
+    with the ``TokenUsage`` of the response. Rate-limit (429), 5xx and
+    connection errors are retried with jittered exponential backoff, honoring
+    the provider's retry-after header; a 429 also pauses every worker until
+    the retry-after has passed, so one throttled request does not turn into a
+    storm of them. Results are returned in input order.
+
+    Args:
+        llm: LLM used for every request
+        requests_per_minute: Request budget
+        tokens_per_minute: Token budget (prompt + completion)
+        max_concurrency: Maximum number of requests in flight
+        expected_completion_tokens: Completion tokens reserved per request
+        max_retries: Retries per request before its error is raised
+        base_delay: First backoff delay in seconds
+        max_delay: Upper bound of a single backoff delay
+
+    Example:
+        >>> scheduler = BatchScheduler(LLM(), requests_per_minute=500, tokens_per_minute=200_000)
+        >>> answers = scheduler.run(["Who made Dark Souls?", "Who made Halo?"])
+    """
+
+    def __init__(self,
+                 llm: LLM,
+                 requests_per_minute: float = 500,
+                 tokens_per_minute: float = 200_000,
+                 max_concurrency: int = 16,
+                 expected_completion_tokens: int = 500,
+                 max_retries: int = 6,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0):
+        # Retries are handled here (with backoff, retry-after and the shared
+        # pause), so turn off the SDK's own retries on a copy of the LLM.
+        # The copy's client shares the original's connection pool.
+        self.llm = copy.copy(llm)
+        self.llm.client = llm.client.with_options(max_retries=0)
+        self.max_concurrency = max_concurrency
+        self.expected_completion_tokens = expected_completion_tokens
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def estimate_tokens(self, input: str | BaseMessage | List[BaseMessage]) -> int:
+        """Rough token estimate of a request: ~4 characters per token"""
+        messages = self.llm._convert_input(input)
+        prompt_chars = sum(len(m.content or "") for m in messages)
+        return prompt_chars // 4 + self.expected_completion_tokens
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying ``error``, or None if it is not retryable"""
+        if not is_transient_error(error):
+            return None
+
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = None
+        if isinstance(error, APIStatusError):
+            retry_after = self._retry_after(error.response)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if isinstance(error, RateLimitError):
+            with self._lock:
+                self._resume_at = max(self._resume_at, time.monotonic() + delay)
+        return delay
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        headers = response.headers
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+        return None
+
+    def _wait_for_resume(self):
+        with self._lock:
+            wait = self._resume_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def _invoke(self, input: str | BaseMessage | List[BaseMessage],
+                response_format: BaseModel = None) -> AIMessage:
+        estimate = self.estimate_tokens(input)
+        attempt = 0
+        while True:
+            self._wait_for_resume()
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(estimate)
+            try:
+                response = self.llm.invoke(input, response_format=response_format)
+            except Exception as error:
+                # The reservation stays spent: a throttled request still
+                # counts against the provider's window
+                delay = self._retry_delay(error, attempt)
+                if delay is None or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            if response.token_usage:
+                self.token_bucket.adjust(estimate - response.token_usage.total_tokens)
+            return response
+
+    def run(self,
+            inputs: List[str | BaseMessage | List[BaseMessage]],
+            response_format: BaseModel = None) -> List[AIMessage]:
+        """
+        Execute all requests and return their responses in input order.
+
+        Raises the first error of a request that failed after all retries.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = [pool.submit(self._invoke, input, response_format) for input in inputs]
+            return [future.result() for future in futures]
@@ -0,0 +1,164 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from pydantic import BaseModel
+
+from lib.messages import AIMessage
+
+
+def _canonical(value: Any) -> Any:
+    """JSON encoder fallback for pydantic objects and response_format classes"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return {"name": value.__name__, "schema": value.model_json_schema()}
+    raise TypeError(f"Cannot hash value of type {type(value)}")
+
+
+def request_key(payload: Dict[str, Any]) -> str:
+    """
+    Stable hash of a chat completion request.
+
+    Covers everything that shapes the answer: model, temperature, messages,
+    tools and response_format.
+    """
+    encoded = json.dumps(payload, sort_keys=True, default=_canonical, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of LLM responses.
+
+    Responses are keyed by ``request_key`` of the request payload and kept in
+    an in-memory LRU tier backed by an optional SQLite file, so repeated
+    prompts (e.g. evaluation judges) are answered without an API call, also
+    across processes. Only deterministic requests (temperature 0) are served
+    from the cache unless ``cache_nonzero_temperature`` is set.
+
+    Args:
+        path: SQLite file for the persistent tier (memory only if None)
+        max_entries: Maximum number of responses kept in memory
+        ttl: Seconds after which an entry expires (never if None)
+        cache_nonzero_temperature: Also cache sampled (temperature > 0) requests
+
+    Example:
+        >>> cache = ResponseCache("llm_cache.sqlite3", ttl=7 * 24 * 3600)
+        >>> llm = LLM(model="gpt-4o-mini", cache=cache)
+        >>> llm.invoke("What is RAG?")
+        >>> cache.stats.hit_ratio
+    """
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 max_entries: int = 1024,
+                 ttl: Optional[float] = None,
+                 cache_nonzero_temperature: bool = False):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.cache_nonzero_temperature = cache_nonzero_temperature
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, created REAL NOT NULL, response TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+    def __repr__(self):
+        return f"ResponseCache(path={self.path!r}, entries={len(self._entries)})"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def cacheable(self, payload: Dict[str, Any]) -> bool:
+        """Whether a request may be served from (and written to) the cache"""
+        return self.cache_nonzero_temperature or not payload.get("temperature")
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        """Look up a response, counting the hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._conn:
+                row = self._conn.execute(
+                    "SELECT created, response FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    try:
+                        entry = (row[0], AIMessage.model_validate_json(row[1]))
+                        self._remember(key, entry)
+                    except ValueError:
+                        # Unreadable (e.g. written by an older version): drop it
+                        self._delete(key)
+
+            if entry is None or self._expired(entry[0]):
+                if entry is not None:
+                    self._delete(key)
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1].model_copy()
+
+    def put(self, key: str, response: AIMessage):
+        with self._lock:
+            entry = (time.time(), response)
+            self._remember(key, entry)
+            if self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                    (key, entry[0], response.model_dump_json()),
+                )
+                self._conn.commit()
+
+    def clear(self):
+        """Drop all entries from both tiers and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.stats = CacheStats()
+            if self._conn:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _delete(self, key: str):
+        self._entries.pop(key, None)
+        if self._conn:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
@@ -1,8 +1,36 @@
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
 import pdfplumber
 from lib.documents import Corpus, Document
 
 
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def page_id(source: str, page: int, text: str) -> str:
+    """
+    Stable id of a page: the same text on the same page of the same file
+    always gets the same id, and any edit to the page gives it a new one.
+    """
+    source_digest = hashlib.sha256(os.path.abspath(source).encode("utf-8")).hexdigest()
+    return f"{source_digest[:12]}-p{page}-{content_hash(text)[:16]}"
+
+
+def _extract_pages(pdf_path: str, first: int, last: int) -> List[Tuple[int, str]]:
+    """Extract the text of pages ``first``..``last`` (1-based, inclusive)"""
+    pages = []
+    with pdfplumber.open(pdf_path, pages=list(range(first, last + 1))) as pdf:
+        for page in pdf.pages:
+            pages.append((page.page_number, page.extract_text()))
+            # Drop the parsed layout objects as soon as the text is out
+            page.close()
+    return pages
+
+
 class PDFLoader:
     """
     Document loader for extracting text content from PDF files.
@@ -15,8 +43,11 @@ class PDFLoader:
     The loader uses pdfplumber for robust PDF text extraction, handling:
     - Multi-page PDF documents
     - Text extraction with layout preservation
-    - Automatic page numbering and identification
+    - Stable page ids derived from the file path, page number and content,
+      so pages of different PDFs never collide in one store
     - Filtering of empty or whitespace-only pages
+    - Streaming extraction (``iter_documents``), parallelized over a process
+      pool for large PDFs
     
     Example:
         >>> loader = PDFLoader("research_paper.pdf")
@@ -24,20 +55,68 @@ class PDFLoader:
         >>> print(f"Loaded {len(corpus)} pages")
         >>> print(f"First page content: {corpus[0].content[:100]}...")
     """
-    def __init__(self, pdf_path:str):
+    def __init__(self, pdf_path:str,
+                 max_workers: Optional[int] = None,
+                 pages_per_task: int = 16,
+                 parallel_threshold: int = 64):
+        """
+        Args:
+            pdf_path: Path of the PDF file
+            max_workers: Processes used to parse large PDFs (default: CPU count)
+            pages_per_task: Pages parsed per worker task
+            parallel_threshold: Minimum page count before a process pool is used
+        """
         self.pdf_path = pdf_path
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.parallel_threshold = parallel_threshold
 
-    def load(self) -> Document:
-        corpus = Corpus()
+    def _make_document(self, num: int, text: str) -> Document:
+        return Document(
+            id=page_id(self.pdf_path, num, text),
+            content=text,
+            metadata={
+                "source": os.path.abspath(self.pdf_path),
+                "page": num,
+                "content_hash": content_hash(text),
+            }
+        )
 
+    def _iter_pages(self) -> Iterator[Tuple[int, str]]:
         with pdfplumber.open(self.pdf_path) as pdf:
-            for num, page in enumerate(pdf.pages, start=1):
-                text = page.extract_text()
-                if text:
-                    corpus.append(
-                        Document(
-                            id=str(num),
-                            content=text
-                        )
-                    )
-        return corpus
+            page_count = len(pdf.pages)
+            if page_count < self.parallel_threshold or self.max_workers < 2:
+                for page in pdf.pages:
+                    yield page.page_number, page.extract_text()
+                    page.close()
+                return
+
+        ranges = [
+            (first, min(first + self.pages_per_task - 1, page_count))
+            for first in range(1, page_count + 1, self.pages_per_task)
+        ]
+        # Keep a bounded window of tasks in flight: workers stay busy while
+        # the consumer embeds earlier pages, but parsed pages never pile up
+        window = self.max_workers * 2
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = deque()
+            for first, last in ranges:
+                pending.append(pool.submit(_extract_pages, self.pdf_path, first, last))
+                if len(pending) >= window:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def iter_documents(self) -> Iterator[Document]:
+        """
+        Yield one Document per non-empty page, in page order, as pages are parsed.
+
+        Example:
+            >>> store.add(PDFLoader("market_report.pdf").iter_documents(), batch_size=64)
+        """
+        for num, text in self._iter_pages():
+            if text:
+                yield self._make_document(num, text)
+
+    def load(self) -> Corpus:
+        return Corpus(list(self.iter_documents()))
@@ -1,10 +1,17 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from collections import OrderedDict
 import copy
+import pickle
+import sys
+import threading
+import time
+
+import numpy as np
 
 from lib.documents import Document, Corpus
-from lib.vector_db import VectorStoreManager,QueryResult
+from lib.vector_db import VectorStoreManager
 
 
 class SessionNotFoundError(Exception):
@@ -12,13 +19,49 @@ class SessionNotFoundError(Exception):
     pass
 
 
+def estimate_size(obj: Any) -> int:
+    """Estimate the memory footprint of an object in bytes via its pickled size"""
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(obj)
+
+
 @dataclass
 class ShortTermMemory():
-    """Manage the history of objects across multiple sessions"""
+    """Manage the history of objects across multiple sessions
+
+    Memory can be bounded per session and globally, by object count and by
+    (estimated) bytes. When a session exceeds its caps its oldest objects are
+    evicted; when the global caps are exceeded whole sessions are evicted in
+    least-recently-used order. Sessions idle for longer than ``session_ttl``
+    seconds are evicted as well. The "default" session is emptied instead of
+    deleted. Every eviction calls ``on_evict(session_id, objects)``, e.g. to
+    spill evicted runs to a RunStore.
+    """
     sessions: Dict[str, List[Any]] = field(default_factory=lambda: {})
+    max_objects_per_session: Optional[int] = None
+    max_bytes_per_session: Optional[int] = None
+    max_sessions: Optional[int] = None
+    max_total_objects: Optional[int] = None
+    max_total_bytes: Optional[int] = None
+    session_ttl: Optional[float] = None
+    on_evict: Optional[Callable[[str, List[Any]], None]] = None
+    size_of: Callable[[Any], int] = estimate_size
+    _sizes: Dict[str, List[int]] = field(default_factory=dict, init=False, repr=False)
+    _session_bytes: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _last_access: Dict[str, float] = field(default_factory=dict, init=False, repr=False)
+    _total_objects: int = field(default=0, init=False, repr=False)
+    _total_bytes: int = field(default=0, init=False, repr=False)
 
     def __post_init__(self):
         """Initialize the default session"""
+        # Sessions are kept in least-recently-used order
+        sessions, self.sessions = self.sessions, OrderedDict()
+        for session_id, objects in sessions.items():
+            self.create_session(session_id)
+            for obj in objects:
+                self.add(obj, session_id)
         self.create_session("default")
 
     def __str__(self) -> str:
@@ -28,6 +71,26 @@ class ShortTermMemory():
     def __repr__(self) -> str:
         return self.__str__()
 
+    @property
+    def _tracks_bytes(self) -> bool:
+        return self.max_bytes_per_session is not None or self.max_total_bytes is not None
+
+    @property
+    def total_objects(self) -> int:
+        """Number of objects held across all sessions"""
+        return self._total_objects
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated bytes held across all sessions (0 unless a byte cap is set)"""
+        return self._total_bytes
+
+    def session_bytes(self, session_id: Optional[str] = None) -> int:
+        """Estimated bytes held by a session (0 unless a byte cap is set)"""
+        session_id = session_id or "default"
+        self._validate_session(session_id)
+        return self._session_bytes[session_id]
+
     def create_session(self, session_id: str) -> bool:
         """Create a new session
         
@@ -37,9 +100,14 @@ class ShortTermMemory():
         Returns:
             bool: True if session was created, False if it already existed
         """
+        self.evict_expired()
         if session_id in self.sessions:
             return False
         self.sessions[session_id] = []
+        self._sizes[session_id] = []
+        self._session_bytes[session_id] = 0
+        self._touch(session_id)
+        self._enforce_global_limits(session_id)
         return True
 
     def delete_session(self, session_id: str) -> bool:
@@ -58,7 +126,8 @@ class ShortTermMemory():
             raise ValueError("Cannot delete the default session")
         if session_id not in self.sessions:
             return False
-        del self.sessions[session_id]
+        self._clear(session_id)
+        self._drop(session_id)
         return True
 
     def _validate_session(self, session_id: str):
@@ -73,6 +142,110 @@ class ShortTermMemory():
         if session_id not in self.sessions:
             raise SessionNotFoundError(f"Session '{session_id}' not found")
 
+    def _touch(self, session_id: str):
+        """Mark a session as most recently used"""
+        self.sessions.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+
+    def _drop(self, session_id: str):
+        del self.sessions[session_id]
+        del self._sizes[session_id]
+        del self._session_bytes[session_id]
+        del self._last_access[session_id]
+
+    def _clear(self, session_id: str) -> List[Any]:
+        """Remove every object of a session and return them"""
+        objects = list(self.sessions[session_id])
+        self._total_objects -= len(objects)
+        self._total_bytes -= self._session_bytes[session_id]
+        self.sessions[session_id].clear()
+        self._sizes[session_id].clear()
+        self._session_bytes[session_id] = 0
+        return objects
+
+    def _evict_oldest(self, session_id: str, count: int = 1):
+        """Evict the ``count`` oldest objects of a session"""
+        objects, sizes = self.sessions[session_id], self._sizes[session_id]
+        evicted, freed = objects[:count], sum(sizes[:count])
+        del objects[:count]
+        del sizes[:count]
+        self._total_objects -= len(evicted)
+        self._total_bytes -= freed
+        self._session_bytes[session_id] -= freed
+        if self.on_evict:
+            self.on_evict(session_id, evicted)
+
+    def _evict_session(self, session_id: str):
+        """Evict a whole session (the default session is only emptied)"""
+        objects = self._clear(session_id)
+        if session_id != "default":
+            self._drop(session_id)
+        if objects and self.on_evict:
+            self.on_evict(session_id, objects)
+
+    def _enforce_session_limits(self, session_id: str):
+        # Count the oldest objects to drop first, then evict them in one slice
+        objects, sizes = self.sessions[session_id], self._sizes[session_id]
+        count, remaining = 0, self._session_bytes[session_id]
+        while count < len(objects) and (
+            (self.max_objects_per_session is not None and len(objects) - count > self.max_objects_per_session)
+            or (self.max_bytes_per_session is not None and remaining > self.max_bytes_per_session)
+        ):
+            remaining -= sizes[count]
+            count += 1
+        if count:
+            self._evict_oldest(session_id, count)
+
+    def _over_size_limits(self) -> bool:
+        return (
+            (self.max_total_objects is not None and self._total_objects > self.max_total_objects)
+            or (self.max_total_bytes is not None and self._total_bytes > self.max_total_bytes)
+        )
+
+    def _over_global_limits(self) -> bool:
+        return (
+            (self.max_sessions is not None and len(self.sessions) > self.max_sessions)
+            or self._over_size_limits()
+        )
+
+    def _enforce_global_limits(self, current_session_id: str):
+        """Evict least-recently-used sessions, sparing the one being written to"""
+        while self._over_global_limits():
+            victim = next(
+                (sid for sid in self.sessions if sid not in (current_session_id, "default")),
+                None,
+            )
+            if victim is not None:
+                self._evict_session(victim)
+            elif not self._over_size_limits():
+                # Only the session count is over and no session can be dropped
+                break
+            elif current_session_id != "default" and self.sessions["default"]:
+                self._evict_session("default")
+            elif self.sessions[current_session_id]:
+                self._evict_oldest(current_session_id)
+            else:
+                break
+
+    def evict_expired(self) -> List[str]:
+        """Evict sessions idle for longer than ``session_ttl`` seconds
+        
+        Returns:
+            List[str]: IDs of the evicted sessions
+        """
+        if self.session_ttl is None:
+            return []
+        deadline = time.monotonic() - self.session_ttl
+        # Sessions are in LRU order, so expired ones are at the front
+        expired = []
+        for session_id in list(self.sessions):
+            if self._last_access[session_id] > deadline:
+                break
+            expired.append(session_id)
+        for session_id in expired:
+            self._evict_session(session_id)
+        return expired
+
     def add(self, object: Any, session_id: Optional[str] = None):
         """Add a new object to the history
         
@@ -84,8 +257,20 @@ class ShortTermMemory():
             SessionNotFoundError: If specified session doesn't exist
         """
         session_id = session_id or "default"
+        self.evict_expired()
         self._validate_session(session_id)
-        self.sessions[session_id].append(copy.deepcopy(object))
+        obj = copy.deepcopy(object)
+        size = self.size_of(obj) if self._tracks_bytes else 0
+
+        self.sessions[session_id].append(obj)
+        self._sizes[session_id].append(size)
+        self._session_bytes[session_id] += size
+        self._total_objects += 1
+        self._total_bytes += size
+        self._touch(session_id)
+
+        self._enforce_session_limits(session_id)
+        self._enforce_global_limits(session_id)
 
     def get_all_objects(self, session_id: Optional[str] = None) -> List[Any]:
         """Get all objects for a session
@@ -101,6 +286,7 @@ class ShortTermMemory():
         """
         session_id = session_id or "default"
         self._validate_session(session_id)
+        self._touch(session_id)
         return [copy.deepcopy(obj) for obj in self.sessions[session_id]]
 
     def get_last_object(self, session_id: Optional[str] = None) -> Optional[Any]:
@@ -115,8 +301,12 @@ class ShortTermMemory():
         Raises:
             SessionNotFoundError: If specified session doesn't exist
         """
-        objects = self.get_all_objects(session_id)
-        return objects[-1] if objects else None
+        session_id = session_id or "default"
+        self._validate_session(session_id)
+        self._touch(session_id)
+        objects = self.sessions[session_id]
+        # Only copy the last object instead of the whole history
+        return copy.deepcopy(objects[-1]) if objects else None
 
     def get_all_sessions(self) -> List[str]:
         """Get all session IDs"""
@@ -132,12 +322,12 @@ class ShortTermMemory():
             SessionNotFoundError: If specified session doesn't exist
         """
         if session_id is None:
-            # Reset all sessions to empty lists
+            # Reset all sessions to empty
             for sid in self.sessions:
-                self.sessions[sid] = []
+                self._clear(sid)
         else:
             self._validate_session(session_id)
-            self.sessions[session_id] = []
+            self._clear(session_id)
 
     def pop(self, session_id: Optional[str] = None) -> Optional[Any]:
         """Remove and return the last object from a session
@@ -156,6 +346,10 @@ class ShortTermMemory():
         
         if not self.sessions[session_id]:
             return None
+        size = self._sizes[session_id].pop()
+        self._total_objects -= 1
+        self._total_bytes -= size
+        self._session_bytes[session_id] -= size
         return self.sessions[session_id].pop()
 
 @dataclass
@@ -208,6 +402,60 @@ class TimestampFilter:
     greater_than_value: int = None
     lower_than_value: int = None
 
+class _MemoryIndex:
+    """
+    Embeddings and metadata of one (owner, namespace) partition.
+
+    Rows are kept sorted by timestamp in preallocated arrays (grown by
+    doubling), so a time range is a contiguous slice found by binary search
+    and a search is one matrix-vector product over that slice.
+    """
+
+    def __init__(self, dim: int):
+        self.size = 0
+        self.timestamps = np.zeros(16, dtype=np.int64)
+        self.vectors = np.zeros((16, dim), dtype=np.float32)
+        self.sq_norms = np.zeros(16, dtype=np.float32)
+        self.contents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+
+    def add(self, vector: np.ndarray, timestamp: int, content: str, metadata: Dict[str, Any]):
+        if self.size == len(self.timestamps):
+            capacity = 2 * self.size
+            self.timestamps = np.resize(self.timestamps, capacity)
+            self.vectors = np.resize(self.vectors, (capacity, self.vectors.shape[1]))
+            self.sq_norms = np.resize(self.sq_norms, capacity)
+
+        # Memories usually arrive in time order, making this an append
+        row = int(np.searchsorted(self.timestamps[:self.size], timestamp, side="right"))
+        end = self.size
+        if row < end:
+            for array in (self.timestamps, self.vectors, self.sq_norms):
+                array[row + 1:end + 1] = array[row:end]
+        self.timestamps[row] = timestamp
+        self.vectors[row] = vector
+        self.sq_norms[row] = float(vector @ vector)
+        self.contents.insert(row, content)
+        self.metadatas.insert(row, metadata)
+        self.size += 1
+
+    def search(self, vector: np.ndarray, limit: int,
+               after: Optional[int] = None, before: Optional[int] = None) -> Tuple[List[int], List[float]]:
+        """Rows of the nearest memories created strictly between ``after`` and ``before``"""
+        timestamps = self.timestamps[:self.size]
+        start = int(np.searchsorted(timestamps, after, side="right")) if after else 0
+        end = int(np.searchsorted(timestamps, before, side="left")) if before else self.size
+        limit = min(limit, end - start)
+        if limit <= 0:
+            return [], []
+
+        # Squared L2, like the Chroma collection's default space
+        distances = self.sq_norms[start:end] - 2 * (self.vectors[start:end] @ vector) + float(vector @ vector)
+        top = np.argpartition(distances, limit - 1)[:limit]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return (top + start).tolist(), distances[top].tolist()
+
+
 class LongTermMemory:
     """
     Manages persistent memory storage and retrieval using vector embeddings.
@@ -221,9 +469,19 @@ class LongTermMemory:
     - Namespace-based organization
     - Time-based filtering
     - Semantic similarity search
+
+    Memories are written to the vector store and also kept in an in-memory
+    index per (owner, namespace), with their embeddings in NumPy arrays
+    sorted by timestamp. Searches only touch the caller's partition: time
+    filters are binary searches and ranking is one matrix-vector product,
+    so apart from embedding the query a lookup takes well under a
+    millisecond. Namespaces are tracked as memories are registered.
     """
     def __init__(self, db:VectorStoreManager):
         self.vector_store = db.create_store("long_term_memory", force=True)
+        self._indexes: Dict[Tuple[str, str], _MemoryIndex] = {}
+        self._namespaces: Set[str] = set()
+        self._lock = threading.Lock()
 
     def get_namespaces(self) -> List[str]:
         """
@@ -235,9 +493,8 @@ class LongTermMemory:
         Returns:
             List[str]: List of unique namespace identifiers
         """
-        results = self.vector_store.get()
-        namespaces = [r["metadatas"][0]["namespace"] for r in results]
-        return namespaces
+        with self._lock:
+            return sorted(self._namespaces)
 
     def register(self, memory_fragment:MemoryFragment, metadata:Optional[Dict[str, str]]=None):
         """
@@ -259,13 +516,24 @@ class LongTermMemory:
         if metadata:
             complete_metadata.update(metadata)
 
+        # Embed once, for both the vector store and the local index
+        embedding = np.asarray(self.vector_store.embed([memory_fragment.content])[0], dtype=np.float32)
         self.vector_store.add(
             Document(
                 content=memory_fragment.content,
                 metadata=complete_metadata,
+                embedding=embedding,
             )
         )
 
+        key = (memory_fragment.owner, memory_fragment.namespace)
+        with self._lock:
+            if key not in self._indexes:
+                self._indexes[key] = _MemoryIndex(len(embedding))
+            self._indexes[key].add(embedding, memory_fragment.timestamp,
+                                   memory_fragment.content, complete_metadata)
+            self._namespaces.add(memory_fragment.namespace)
+
     def search(self, query_text:str, owner:str, limit:int=3,
                timestamp_filter:Optional[TimestampFilter]=None, 
                namespace:Optional[str]="default") -> MemorySearchResult:
@@ -286,65 +554,30 @@ class LongTermMemory:
         Returns:
             MemorySearchResult: Container with matching memory fragments and metadata
         """
-
-        where = {
-            "$and": [
-                {
-                    "namespace": {
-                        "$eq": namespace
-                    }
-                },
-                {
-                    "owner": {
-                        "$eq": owner
-                    }
-                },
-            ]
-        }
-
-        if timestamp_filter:
-            if timestamp_filter.greater_than_value:
-                where["$and"].append({
-                    "timestamp": {
-                        "$gt": timestamp_filter.greater_than_value,
-                    }
-                })
-            if timestamp_filter.lower_than_value:
-                where["$and"].append({
-                    "timestamp": {
-                        "$lt": timestamp_filter.lower_than_value,
-                    }
-                })
-
-        result:QueryResult = self.vector_store.query(
-            query_texts=[query_text],
-            n_results=limit,
-            where=where
-        )
-
-        fragments = []
-        documents = result.get("documents", [[]])[0]
-        metadatas = result.get("metadatas", [[]])[0]
-
-        for content, meta in zip(documents, metadatas):
-            owner = meta.get("owner")
-            namespace = meta.get("namespace", "default")
-            timestamp = meta.get("timestamp")
-
-            fragment = MemoryFragment(
+        with self._lock:
+            index = self._indexes.get((owner, namespace))
+        if index is None:
+            # Nothing to rank, so skip embedding the query
+            return MemorySearchResult(fragments=[], metadata={"distances": []})
+
+        vector = np.asarray(self.vector_store.embed([query_text])[0], dtype=np.float32)
+        after = timestamp_filter.greater_than_value if timestamp_filter else None
+        before = timestamp_filter.lower_than_value if timestamp_filter else None
+        with self._lock:
+            rows, distances = index.search(vector, limit, after, before)
+            matches = [(index.contents[row], index.metadatas[row]) for row in rows]
+
+        fragments = [
+            MemoryFragment(
                 content=content,
-                owner=owner,
-                namespace=namespace,
-                timestamp=timestamp
+                owner=meta.get("owner"),
+                namespace=meta.get("namespace", "default"),
+                timestamp=meta.get("timestamp"),
             )
-
-            fragments.append(fragment)
-        
-        result_metadata = {
-            "distances": result.get("distances", [[]])[0]
-        }
+            for content, meta in matches
+        ]
 
         return MemorySearchResult(
             fragments=fragments,
-            metadata=result_metadata
+            metadata={"distances": distances}
         )
@@ -0,0 +1,152 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+import threading
+
+
+Scalar = Any
+# Sorts after every id, for bisecting past all entries of a value
+_MAX_ID = "\uffff"
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _key(value: Scalar) -> Tuple[bool, Scalar]:
+    # Keep True apart from 1, as Chroma does
+    return isinstance(value, bool), value
+
+
+class UnsupportedFilter(ValueError):
+    """Raised for ``where`` clauses the index cannot evaluate exactly"""
+
+
+class MetadataIndex:
+    """
+    Exact indexes over document metadata.
+
+    Every scalar field gets a hash index (value -> ids) for equality and
+    membership tests, and numeric fields also get a sorted array of
+    (value, id) pairs for range tests. ``filter`` evaluates Chroma-style
+    ``where`` clauses ($eq, $ne, $gt, $gte, $lt, $lte, $in, $nin, $and,
+    $or) against them without touching the vector index.
+
+    Example:
+        >>> index = MetadataIndex()
+        >>> index.add("001", {"Genre": "Racing", "YearOfRelease": 1997})
+        >>> index.filter({"$and": [{"Genre": "Racing"}, {"YearOfRelease": {"$lt": 2000}}]})
+        {'001'}
+    """
+
+    def __init__(self):
+        self._hash: Dict[str, Dict[Tuple[bool, Scalar], Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self._sorted: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+        self._records: Dict[str, Dict[str, Scalar]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, doc_id: str, metadata: Optional[Dict[str, Any]]):
+        """Index a document's metadata, replacing any previous version"""
+        record = {
+            field: value for field, value in (metadata or {}).items()
+            if isinstance(value, (str, int, float, bool))
+        }
+        with self._lock:
+            self._remove(doc_id)
+            self._records[doc_id] = record
+            for field, value in record.items():
+                self._hash[field][_key(value)].add(doc_id)
+                if _is_number(value):
+                    insort(self._sorted[field], (value, doc_id))
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        record = self._records.pop(doc_id, None)
+        if record is None:
+            return
+        for field, value in record.items():
+            ids = self._hash[field][_key(value)]
+            ids.discard(doc_id)
+            if not ids:
+                del self._hash[field][_key(value)]
+            if _is_number(value):
+                entries = self._sorted[field]
+                position = bisect_left(entries, (value, doc_id))
+                if position < len(entries) and entries[position] == (value, doc_id):
+                    del entries[position]
+
+    def filter(self, where: Dict[str, Any]) -> Set[str]:
+        """
+        Ids of the documents matching ``where``.
+
+        Raises:
+            UnsupportedFilter: If the clause uses operators or value types
+                the index cannot evaluate exactly
+        """
+        with self._lock:
+            return self._evaluate(where)
+
+    def _evaluate(self, where: Dict[str, Any]) -> Set[str]:
+        if not isinstance(where, dict) or not where:
+            raise UnsupportedFilter(f"Invalid where clause: {where!r}")
+
+        results = []
+        for field, condition in where.items():
+            if field in ("$and", "$or"):
+                parts = [self._evaluate(clause) for clause in condition]
+                if field == "$and":
+                    results.append(set.intersection(*parts) if parts else set())
+                else:
+                    results.append(set.union(*parts) if parts else set())
+            elif isinstance(condition, dict):
+                for operator, operand in condition.items():
+                    results.append(self._compare(field, operator, operand))
+            else:
+                results.append(self._equal(field, condition))
+
+        # Several keys in one clause are implicitly combined with AND
+        return set.intersection(*results)
+
+    def _equal(self, field: str, value: Scalar) -> Set[str]:
+        if not isinstance(value, (str, int, float, bool)):
+            raise UnsupportedFilter(f"Unsupported value for {field}: {value!r}")
+        return set(self._hash.get(field, {}).get(_key(value), ()))
+
+    def _field_ids(self, field: str) -> Set[str]:
+        return set().union(*self._hash.get(field, {}).values())
+
+    def _compare(self, field: str, operator: str, operand: Any) -> Set[str]:
+        if operator == "$eq":
+            return self._equal(field, operand)
+        if operator == "$ne":
+            return self._field_ids(field) - self._equal(field, operand)
+        if operator in ("$in", "$nin"):
+            if not isinstance(operand, list):
+                raise UnsupportedFilter(f"{operator} expects a list, got {operand!r}")
+            matches = set().union(*(self._equal(field, value) for value in operand))
+            return matches if operator == "$in" else self._field_ids(field) - matches
+        if operator in _RANGE_OPERATORS:
+            if not _is_number(operand):
+                raise UnsupportedFilter(f"{operator} expects a number, got {operand!r}")
+            return self._range(field, operator, operand)
+        raise UnsupportedFilter(f"Unsupported operator {operator}")
+
+    def _range(self, field: str, operator: str, bound: float) -> Set[str]:
+        entries = self._sorted.get(field, [])
+        # (value, "") sorts before and (value, _MAX_ID) after every id of that value
+        if operator == "$gt":
+            start, end = bisect_right(entries, (bound, _MAX_ID)), len(entries)
+        elif operator == "$gte":
+            start, end = bisect_left(entries, (bound, "")), len(entries)
+        elif operator == "$lt":
+            start, end = 0, bisect_left(entries, (bound, ""))
+        else:
+            start, end = 0, bisect_right(entries, (bound, _MAX_ID))
+        return {doc_id for _, doc_id in entries[start:end]}
@@ -0,0 +1,549 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import bisect
+import json
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+
+EmbedFn = Callable[[List[str]], Sequence[Sequence[float]]]
+SPACES = ("l2", "cosine", "ip")
+# Share of rows matching a filter above which the whole matrix is scanned
+DENSE_SCAN_FRACTION = 0.25
+
+
+class _IVFIndex:
+    """
+    Inverted-file ANN index: vectors are bucketed by their nearest k-means
+    centroid, and a query only scans the rows of the ``nprobe`` closest
+    buckets.
+    """
+
+    def __init__(self, vectors: np.ndarray, n_lists: int, nprobe: int,
+                 iterations: int = 10, sample_size: int = 20000, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False)]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = self._nearest(sample, centroids)
+            for list_id in range(n_lists):
+                members = sample[assignment == list_id]
+                if len(members):
+                    centroids[list_id] = members.mean(axis=0)
+        self.centroids = centroids
+        self.nprobe = min(nprobe, n_lists)
+        self.assignment = self._nearest(vectors, centroids)
+        self.trained_size = len(vectors)
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # argmin |v - c|^2 == argmax (v.c - |c|^2 / 2)
+        scores = vectors @ centroids.T - 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+        return scores.argmax(axis=1).astype(np.int32)
+
+    def extend(self, vectors: np.ndarray):
+        """Assign rows appended after training to their nearest list"""
+        if len(vectors) > len(self.assignment):
+            new = self._nearest(vectors[len(self.assignment):], self.centroids)
+            self.assignment = np.concatenate([self.assignment, new])
+
+    def update(self, rows: np.ndarray, vectors: np.ndarray):
+        self.assignment[rows] = self._nearest(vectors, self.centroids)
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        """Boolean row mask of the buckets closest to ``query``"""
+        scores = self.centroids @ query - 0.5 * np.einsum("ij,ij->i", self.centroids, self.centroids)
+        probe = np.argpartition(-scores, self.nprobe - 1)[:self.nprobe]
+        return np.isin(self.assignment, probe)
+
+
+class NumpyCollection:
+    """
+    In-process vector collection backed by a contiguous float32 NumPy matrix.
+
+    Implements the subset of the Chroma ``Collection`` API that
+    ``VectorStore`` uses (add, upsert, delete, get, query, count), so it can
+    be used as a drop-in backend: ``VectorStore(NumpyCollection(...))``.
+
+    - Embeddings live in one float32 matrix, memory-mapped from
+      ``<path>/vectors.f32`` when a path is given, so opening a store does
+      not load or rebuild anything
+    - Records (ids, documents, metadata) are kept in ``<path>/records.sqlite3``
+      and loaded once at startup; queries never touch SQLite
+    - Small collections are searched exactly with a vectorized top-k
+      (``argpartition``); past ``ann_threshold`` rows an IVF index narrows
+      the scan to the nearest buckets
+    - Metadata filters are evaluated on columnar arrays (one per field)
+
+    Distances follow Chroma: squared L2 for "l2", ``1 - cos`` for "cosine"
+    and ``1 - dot`` for "ip".
+
+    Args:
+        embedding_function: Callable embedding a list of texts
+        path: Directory to persist to (in memory if None)
+        space: "l2" (default), "cosine" or "ip"
+        ann_threshold: Row count from which the IVF index is used
+        nprobe: Buckets scanned per ANN query
+
+    Example:
+        >>> collection = NumpyCollection(embedding_fn, path="stores/games")
+        >>> store = VectorStore(collection)
+        >>> store.add(documents)
+        >>> store.query(["racing game"], n_results=5)
+    """
+
+    def __init__(self,
+                 embedding_function: EmbedFn,
+                 path: Optional[str] = None,
+                 space: str = "l2",
+                 ann_threshold: int = 50000,
+                 nprobe: int = 16):
+        if space not in SPACES:
+            raise ValueError(f"space must be one of {SPACES}, got {space!r}")
+        self.embedding_function = embedding_function
+        self.path = path
+        self.space = space
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._size = 0
+        self._columns: Dict[str, tuple] = {}
+        # All documents joined by NUL, with the offset each one starts at
+        self._text: Optional[Tuple[str, List[int]]] = None
+        self._ann: Optional[_IVFIndex] = None
+        self._conn = None
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(path, "records.sqlite3"), check_same_thread=False)
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS records (
+                    row INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL,
+                    document TEXT,
+                    metadata TEXT,
+                    alive INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                """
+            )
+            self._load()
+
+    def __repr__(self):
+        return f"NumpyCollection(path={self.path!r}, count={self.count()})"
+
+    # -- storage ---------------------------------------------------------
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    def _load(self):
+        info = dict(self._conn.execute("SELECT key, value FROM info").fetchall())
+        if info.setdefault("space", self.space) != self.space:
+            raise ValueError(f"{self.path} was created with space={info['space']!r}, not {self.space!r}")
+        self._conn.execute("INSERT OR REPLACE INTO info VALUES ('space', ?)", (self.space,))
+        self._conn.commit()
+        rows = self._conn.execute("SELECT row, id, document, metadata, alive FROM records ORDER BY row").fetchall()
+        if not rows:
+            return
+        self._size = len(rows)
+        self._ids = [row[1] for row in rows]
+        self._documents = [row[2] for row in rows]
+        self._metadatas = [json.loads(row[3]) if row[3] else None for row in rows]
+        self._rows = {row[1]: row[0] for row in rows if row[4]}
+
+        dim = int(info["dim"])
+        capacity = os.path.getsize(self._vectors_path) // (4 * dim)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:self._size] = [bool(row[4]) for row in rows]
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+        self._sq_norms[:self._size] = np.einsum("ij,ij->i", self._vectors[:self._size], self._vectors[:self._size])
+
+    def _reserve(self, rows: int, dim: int):
+        """Make room for ``rows`` more vectors, doubling the capacity as needed"""
+        if self._size == 0 and self._vectors.shape[1] != dim:
+            self._vectors = np.zeros((0, dim), dtype=np.float32)
+            if self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO info VALUES ('dim', ?)", (str(dim),))
+        if self._vectors.shape[1] != dim:
+            raise ValueError(f"Embedding dimension {dim} does not match the collection's {self._vectors.shape[1]}")
+
+        needed = self._size + rows
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, 2 * capacity, 1024)
+        if self.path:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(new_capacity * dim * 4)
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, dim))
+        else:
+            grown = np.zeros((new_capacity, dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._alive = np.concatenate([self._alive, np.zeros(new_capacity - len(self._alive), dtype=bool)])
+        self._sq_norms = np.concatenate([self._sq_norms, np.zeros(new_capacity - len(self._sq_norms), dtype=np.float32)])
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(self.embedding_function(list(texts)), dtype=np.float32)
+        if self.space == "cosine":
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+    def _persist(self, rows: List[int]):
+        if not self._conn:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)",
+            [
+                (row, self._ids[row], self._documents[row],
+                 json.dumps(self._metadatas[row]) if self._metadatas[row] is not None else None,
+                 int(self._alive[row]))
+                for row in rows
+            ],
+        )
+        self._conn.commit()
+        self._vectors.flush()
+
+    def _write(self, ids: List[str], documents: Optional[List[str]],
+               metadatas: Optional[List[Optional[Dict[str, Any]]]],
+               embeddings: Optional[Sequence[Sequence[float]]], replace: bool):
+        if isinstance(ids, str):
+            ids = [ids]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Expected IDs to be unique")
+        documents = documents if documents is not None else [None] * len(ids)
+        metadatas = metadatas if metadatas is not None else [None] * len(ids)
+
+        with self._lock:
+            if not replace:
+                keep = [i for i, doc_id in enumerate(ids) if doc_id not in self._rows]
+                ids = [ids[i] for i in keep]
+                documents = [documents[i] for i in keep]
+                metadatas = [metadatas[i] for i in keep]
+                if embeddings is not None:
+                    embeddings = [embeddings[i] for i in keep]
+            if not ids:
+                return
+
+        # Embed outside the lock so concurrent batches overlap their API calls
+        if embeddings is not None:
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            if self.space == "cosine":
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        else:
+            vectors = self._embed(documents)
+
+        with self._lock:
+            self._reserve(len(ids), vectors.shape[1])
+            rows = []
+            for doc_id, document, metadata, vector in zip(ids, documents, metadatas, vectors):
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._ids.append(doc_id)
+                    self._documents.append(document)
+                    self._metadatas.append(metadata)
+                    self._rows[doc_id] = row
+                else:
+                    self._documents[row] = document
+                    self._metadatas[row] = metadata
+                self._vectors[row] = vector
+                self._sq_norms[row] = float(vector @ vector)
+                self._alive[row] = True
+                rows.append(row)
+
+            self._columns.clear()
+            self._text = None
+            if self._ann is not None:
+                self._ann.extend(self._vectors[:self._size])
+                self._ann.update(np.asarray(rows), self._vectors[rows])
+            self._persist(rows)
+
+    # -- Chroma Collection API -------------------------------------------
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def add(self, ids: List[str], documents: Optional[List[str]] = None,
+            metadatas: Optional[List[Dict[str, Any]]] = None,
+            embeddings: Optional[Sequence[Sequence[float]]] = None):
+        """Add new records; ids that already exist are ignored, as in Chroma"""
+        self._write(ids, documents, metadatas, embeddings, replace=False)
+
+    def upsert(self, ids: List[str], documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None,
+               embeddings: Optional[Sequence[Sequence[float]]] = None):
+        self._write(ids, documents, metadatas, embeddings, replace=True)
+
+    def delete(self, ids: Optional[List[str]] = None,
+               where: Optional[Dict[str, Any]] = None,
+               where_document: Optional[Dict[str, Any]] = None):
+        if ids is None and not where and not where_document:
+            # As in Chroma: an unfiltered delete would empty the collection
+            raise ValueError("At least one of ids, where, or where_document must be provided in delete.")
+        with self._lock:
+            mask = self._mask(ids, where, where_document)
+            rows = np.flatnonzero(mask).tolist()
+            for row in rows:
+                self._alive[row] = False
+                del self._rows[self._ids[row]]
+            self._columns.clear()
+            self._persist(rows)
+
+    def get(self, ids: Optional[List[str]] = None,
+            where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None,
+            offset: Optional[int] = None,
+            where_document: Optional[Dict[str, Any]] = None,
+            include: Sequence[str] = ("metadatas", "documents")) -> Dict[str, Any]:
+        with self._lock:
+            rows = np.flatnonzero(self._mask(ids, where, where_document))
+            if ids is not None:
+                # Return records in the requested order, as Chroma does
+                order = {doc_id: i for i, doc_id in enumerate([ids] if isinstance(ids, str) else ids)}
+                rows = np.array(sorted(rows, key=lambda row: order[self._ids[row]]), dtype=np.int64)
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            return self._records(rows, include)
+
+    def query(self, query_texts: Optional[List[str]] = None,
+              n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None,
+              where_document: Optional[Dict[str, Any]] = None,
+              include: Sequence[str] = ("metadatas", "documents", "distances"),
+              query_embeddings: Optional[Sequence[Sequence[float]]] = None) -> Dict[str, Any]:
+        if query_embeddings is not None:
+            queries = np.asarray(query_embeddings, dtype=np.float32)
+            if self.space == "cosine":
+                queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        else:
+            if isinstance(query_texts, str):
+                query_texts = [query_texts]
+            # One embedding call for all queries
+            queries = self._embed(query_texts)
+
+        with self._lock:
+            mask = self._mask(None, where, where_document)
+            use_ann = self._size >= self.ann_threshold
+            if use_ann and (self._ann is None or self._size > 2 * self._ann.trained_size):
+                self._train_ann()
+
+            result = {key: [] for key in ("ids", "documents", "metadatas", "distances") if key == "ids" or key in include}
+            for query in queries:
+                query_mask = mask
+                if use_ann:
+                    probed = mask & self._ann.candidates(query)
+                    # Fall back to an exact scan when the probed buckets are too sparse
+                    if probed.sum() >= n_results:
+                        query_mask = probed
+                rows, distances = self._top_k(query, query_mask, n_results)
+                records = self._records(rows, include)
+                for key in records:
+                    result[key].append(records[key])
+                if "distances" in include:
+                    result["distances"].append(distances.tolist())
+            return result
+
+    def close(self):
+        with self._lock:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    # -- search ----------------------------------------------------------
+
+    def _train_ann(self):
+        vectors = self._vectors[:self._size]
+        n_lists = max(1, int(np.sqrt(self._size)))
+        self._ann = _IVFIndex(np.asarray(vectors), n_lists, self.nprobe)
+
+    def _top_k(self, query: np.ndarray, mask: np.ndarray, k: int):
+        matches = int(mask.sum())
+        k = min(k, matches)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if matches >= DENSE_SCAN_FRACTION * self._size:
+            # Scanning the contiguous matrix beats gathering most of its rows
+            rows = None
+            dots = self._vectors[:self._size] @ query
+            sq_norms = self._sq_norms[:self._size]
+        else:
+            rows = np.flatnonzero(mask)
+            dots = self._vectors[rows] @ query
+            sq_norms = self._sq_norms[rows]
+        if self.space == "l2":
+            distances = sq_norms - 2 * dots + float(query @ query)
+        else:
+            distances = 1 - dots
+        if rows is None:
+            distances[~mask] = np.inf
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return (top if rows is None else rows[top]), distances[top]
+
+    def _records(self, rows: np.ndarray, include: Sequence[str]) -> Dict[str, Any]:
+        records = {"ids": [self._ids[row] for row in rows]}
+        if "documents" in include:
+            records["documents"] = [self._documents[row] for row in rows]
+        if "metadatas" in include:
+            records["metadatas"] = [self._metadatas[row] for row in rows]
+        if "embeddings" in include:
+            records["embeddings"] = [np.array(self._vectors[row]) for row in rows]
+        return records
+
+    # -- filtering -------------------------------------------------------
+
+    @staticmethod
+    def _code_key(value: Any) -> tuple:
+        # As in Chroma, True does not equal 1, while 1 and 1.0 are equal
+        return (isinstance(value, bool), value)
+
+    def _column(self, field: str) -> tuple:
+        """(codes, code of each value, presence mask, numeric values, numeric mask)
+        of a metadata field, built on demand.
+
+        Values are dictionary-encoded (see ``_code_key``), so equality
+        filters compare integer codes: -1 marks a missing value and -2 an
+        unhashable one, which is present but equal to no operand.
+        """
+        if field not in self._columns:
+            codes = np.full(self._size, -1, dtype=np.int64)
+            code_of: Dict[Any, int] = {}
+            numbers = np.full(self._size, np.nan)
+            for row, metadata in enumerate(self._metadatas):
+                value = metadata.get(field) if metadata else None
+                if value is None:
+                    continue
+                try:
+                    codes[row] = code_of.setdefault(self._code_key(value), len(code_of))
+                except TypeError:
+                    codes[row] = -2
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    numbers[row] = value
+            self._columns[field] = (codes, code_of, codes != -1, numbers, ~np.isnan(numbers))
+        return self._columns[field]
+
+    def _mask(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]],
+              where_document: Optional[Dict[str, Any]]) -> np.ndarray:
+        mask = self._alive[:self._size].copy()
+        if ids is not None:
+            selected = np.zeros(self._size, dtype=bool)
+            for doc_id in ([ids] if isinstance(ids, str) else ids):
+                row = self._rows.get(doc_id)
+                if row is not None:
+                    selected[row] = True
+            mask &= selected
+        if where:
+            mask &= self._where(where)
+        if where_document:
+            mask &= self._where_document(where_document)
+        return mask
+
+    def _where(self, where: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(self._size, dtype=bool)
+        for field, condition in where.items():
+            if field == "$and":
+                for clause in condition:
+                    mask &= self._where(clause)
+            elif field == "$or":
+                union = np.zeros(self._size, dtype=bool)
+                for clause in condition:
+                    union |= self._where(clause)
+                mask &= union
+            elif isinstance(condition, dict):
+                for operator, operand in condition.items():
+                    mask &= self._compare(field, operator, operand)
+            else:
+                mask &= self._compare(field, "$eq", condition)
+        return mask
+
+    def _compare(self, field: str, operator: str, operand: Any) -> np.ndarray:
+        codes, code_of, present, numbers, is_number = self._column(field)
+        if operator in ("$eq", "$ne", "$in", "$nin"):
+            operands = operand if operator in ("$in", "$nin") else [operand]
+            wanted = []
+            for value in operands:
+                try:
+                    key = self._code_key(value)
+                    if key in code_of:
+                        wanted.append(code_of[key])
+                except TypeError:
+                    pass  # Unhashable operands match nothing
+            matches = np.isin(codes, wanted)
+            return matches if operator in ("$eq", "$in") else present & ~matches
+        comparisons = {"$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal}
+        if operator in comparisons:
+            with np.errstate(invalid="ignore"):
+                return is_number & comparisons[operator](numbers, operand)
+        raise ValueError(f"Unsupported operator {operator}")
+
+    def _where_document(self, where_document: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(self._size, dtype=bool)
+        for operator, operand in where_document.items():
+            if operator == "$and":
+                for clause in operand:
+                    mask &= self._where_document(clause)
+                continue
+            if operator == "$or":
+                union = np.zeros(self._size, dtype=bool)
+                for clause in operand:
+                    union |= self._where_document(clause)
+                mask &= union
+                continue
+            if operator in ("$contains", "$not_contains"):
+                matches = self._contains(operand)
+            elif operator in ("$regex", "$not_regex"):
+                # Patterns may use anchors, so they are run per document
+                pattern = re.compile(operand)
+                matches = np.array([bool(document) and pattern.search(document) is not None
+                                    for document in self._documents], dtype=bool)
+            else:
+                raise ValueError(f"Unsupported operator {operator}")
+            mask &= ~matches if operator.startswith("$not") else matches
+        return mask
+
+    def _contains(self, substring: str) -> np.ndarray:
+        """Rows whose document contains ``substring``.
+
+        Searches one string holding every document, so rows without a match
+        are skipped by ``str.find`` instead of being visited one by one.
+        """
+        matches = np.zeros(self._size, dtype=bool)
+        if not substring or "\0" in substring:
+            for row, document in enumerate(self._documents):
+                matches[row] = bool(document) and substring in document
+            return matches
+        if self._text is None:
+            starts, offset = [], 0
+            for document in self._documents:
+                starts.append(offset)
+                offset += len(document or "") + 1
+            self._text = ("\0".join(document or "" for document in self._documents), starts)
+        text, starts = self._text
+        position = text.find(substring)
+        while position != -1:
+            row = bisect.bisect_right(starts, position) - 1
+            matches[row] = True
+            # Continue from the next document; one match per row is enough
+            position = text.find(substring, starts[row + 1]) if row + 1 < len(starts) else -1
+        return matches
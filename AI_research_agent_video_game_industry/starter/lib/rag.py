@@ -1,10 +1,13 @@
-from typing import TypedDict, List
+from typing import Any, TypedDict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 from lib.state_machine import StateMachine, Step, EntryPoint, Termination, Run, Resource
-from lib.llm import LLM
+from lib.llm import LLM, TokenCallback
 from lib.messages import BaseMessage, UserMessage, SystemMessage
 from lib.vector_db import VectorStore
+from lib.semantic_cache import SemanticCache
+from lib.rerank import ContextSelector
 
 
 logging.getLogger('pdfminer').setLevel(logging.ERROR)
@@ -16,9 +19,13 @@ class RAGState(TypedDict):
     """
     messages: List[BaseMessage]
     question: str
+    ids: List[str]
     documents: List[str]
     distances: List[float]
+    context_ids: List[str]
     answer: str
+    query_embedding: List[float]
+    store_version: int  # Vector store version the retrieval ran against
 
 class RAG:
     """
@@ -31,8 +38,57 @@ class RAG:
     
     The RAG pattern enhances LLM responses by providing relevant external knowledge,
     reducing hallucinations and improving factual accuracy.
+
+    Args:
+        llm: LLM generating the answers
+        vector_store: Store the context is retrieved from
+        n_results: Documents retrieved per question
+        retrieval_mode: "dense" (default), "lexical" or "hybrid", see
+            ``VectorStore.query``
+        lexical_shortcut: In hybrid mode, skip the embedding call when the
+            best lexical match scores this many times the runner-up
+        retrieval_cache: Optional SemanticCache of retrieved documents, so
+            near-duplicate questions skip the vector store query
+        answer_cache: Optional SemanticCache of final answers, so
+            near-duplicate questions skip generation; give it a stricter
+            threshold than the retrieval cache
+        context_selector: Optional ContextSelector; retrieval then fetches
+            its ``n_candidates`` documents instead of ``n_results``, and the
+            selector picks the ones packed into the prompt; its
+            ``max_distance`` requires ``retrieval_mode="dense"``
+
+    Cache entries are keyed by question embeddings and invalidated whenever
+    the vector store is written to. Questions are embedded only when that is
+    needed anyway: the answer cache always needs the embedding, while the
+    retrieval cache is only consulted for queries that embed the question
+    ("dense", or "hybrid" without ``lexical_shortcut``), so lexical
+    retrieval keeps skipping the embedding call. An embedding is computed
+    once and shared by the cache lookups and the store query.
+
+    Example:
+        >>> rag = RAG(llm, store,
+        ...           retrieval_cache=SemanticCache(threshold=0.95),
+        ...           answer_cache=SemanticCache(threshold=0.99))
     """
-    def __init__(self, llm: LLM, vector_store: VectorStore):
+    def __init__(self, llm: LLM, vector_store: VectorStore,
+                 n_results: int = 3,
+                 retrieval_mode: str = "dense",
+                 lexical_shortcut: Optional[float] = None,
+                 retrieval_cache: Optional[SemanticCache] = None,
+                 answer_cache: Optional[SemanticCache] = None,
+                 context_selector: Optional[ContextSelector] = None):
+        if context_selector is not None and context_selector.max_distance is not None \
+                and retrieval_mode != "dense":
+            raise ValueError(
+                f"context_selector.max_distance needs dense retrieval; {retrieval_mode!r} "
+                "retrieval returns relative distances"
+            )
+        self.n_results = n_results
+        self.retrieval_mode = retrieval_mode
+        self.lexical_shortcut = lexical_shortcut
+        self.retrieval_cache = retrieval_cache
+        self.answer_cache = answer_cache
+        self.context_selector = context_selector
         self.workflow = self._create_state_machine()
         self.resource = Resource(
             vars = {
@@ -41,20 +97,70 @@ class RAG:
             }
         )
 
+    def _search(self, vector_store: VectorStore, questions: List[str]) -> List[RAGState]:
+        """Retrieval state updates per question, from one batched query"""
+        # A retrieval cache lookup would cost an embedding call the query may not make
+        query_embeds = self.retrieval_mode == "dense" or (
+            self.retrieval_mode == "hybrid" and not self.lexical_shortcut
+        )
+        retrieval_cache = self.retrieval_cache if query_embeds else None
+        vectors: Optional[List[Any]] = None
+        if retrieval_cache is not None or self.answer_cache is not None:
+            vectors = vector_store.embed(questions)
+        version = vector_store.version
+
+        # (ids, documents, distances) per question
+        hits = [
+            retrieval_cache.get(vector, version) if retrieval_cache is not None else None
+            for vector in (vectors if vectors is not None else questions)
+        ]
+        misses = [i for i, hit in enumerate(hits) if hit is None]
+        if misses:
+            results = vector_store.query(
+                query_texts=[questions[i] for i in misses],
+                n_results=self.context_selector.n_candidates if self.context_selector else self.n_results,
+                mode=self.retrieval_mode,
+                lexical_shortcut=self.lexical_shortcut,
+                query_embeddings=[vectors[i] for i in misses] if vectors is not None else None,
+            )
+            for j, i in enumerate(misses):
+                hits[i] = (results['ids'][j], results['documents'][j], results['distances'][j])
+                if retrieval_cache is not None:
+                    retrieval_cache.put(vectors[i], hits[i], version)
+
+        updates = []
+        for i, (ids, documents, distances) in enumerate(hits):
+            update: RAGState = {"ids": ids, "documents": documents, "distances": distances,
+                                "store_version": version}
+            if vectors is not None:
+                update["query_embedding"] = vectors[i]
+            if self.answer_cache is not None:
+                answer = self.answer_cache.get(vectors[i], version)
+                if answer is not None:
+                    update["answer"] = answer
+            updates.append(update)
+        return updates
+
     def _retrieve(self, state:RAGState, resource:Resource) -> RAGState:
-        question = state["question"]
-        vector_store:VectorStore = resource.vars.get("vector_store")
-        results = vector_store.query(query_texts=[question])
+        # Set by ``batch``, which retrieves for all questions up front
+        update = resource.vars.get("retrieved")
+        if update is None:
+            vector_store:VectorStore = resource.vars.get("vector_store")
+            update = self._search(vector_store, [state["question"]])[0]
 
-        documents = results['documents'][0] if results['documents'] else []
-        distances = results['distances'][0] if results['distances'] else []
-        
-        return {"documents": documents, "distances": distances}
+        on_token = resource.vars.get("on_token")
+        if "answer" in update and on_token:
+            on_token(update["answer"])
+        return update
 
     def _augment(self, state:RAGState) -> RAGState:
         question = state["question"]
         documents = state["documents"]
-        context = "\n\n".join(documents)
+        if self.context_selector is not None:
+            chosen = self.context_selector.select(documents, state["distances"])
+        else:
+            chosen = list(range(len(documents)))
+        context = "\n\n".join(documents[i] for i in chosen)
 
         messages = [
             SystemMessage(content="You are an assistant for question-answering tasks."),
@@ -69,11 +175,15 @@ class RAG:
             )
         ]
 
-        return {"messages": messages}
+        return {"messages": messages, "context_ids": [state["ids"][i] for i in chosen]}
 
     def _generate(self, state:RAGState, resource:Resource) -> RAGState:
         llm:LLM = resource.vars.get("llm")
-        ai_message = llm.invoke(state["messages"])
+        ai_message = llm.invoke(state["messages"], on_token=resource.vars.get("on_token"))
+        if self.answer_cache is not None:
+            # Tagged with the version retrieved from, so a write since then
+            # leaves the answer stale instead of marking it current
+            self.answer_cache.put(state["query_embedding"], ai_message.content, state["store_version"])
         return {
             "answer": ai_message.content, 
             "messages": state["messages"] + [ai_message],
@@ -91,13 +201,20 @@ class RAG:
 
         machine.add_steps([entry, retrieve, augment, generate, termination])
         machine.connect(entry, retrieve)
-        machine.connect(retrieve, augment)
+
+        # Answers served by the answer cache skip augmentation and generation
+        def check_cached_answer(state: RAGState) -> Step[RAGState]:
+            if state.get("answer") is not None:
+                return termination
+            return augment
+
+        machine.connect(retrieve, [augment, termination], check_cached_answer)
         machine.connect(augment, generate)
         machine.connect(generate, termination)
 
         return machine
 
-    def invoke(self, query: str) -> Run:
+    def invoke(self, query: str, on_token: Optional[TokenCallback] = None) -> Run:
         """
         Execute the complete RAG pipeline for a given query.
         
@@ -107,6 +224,8 @@ class RAG:
         
         Args:
             query (str): The user's question or search query
+            on_token (callable, optional): Receives answer deltas as the LLM
+                generates them, e.g. to stream the answer to a web front end
             
         Returns:
             Run: Execution object containing the final state and pipeline results
@@ -122,6 +241,40 @@ class RAG:
         }
         run_object = self.workflow.run(
             state = initial_state, 
-            resource = self.resource,
+            resource = Resource(vars={**self.resource.vars, "on_token": on_token}),
         )
         return run_object
+
+    def batch(self, questions: List[str], max_workers: int = 8) -> List[Run]:
+        """
+        Run the RAG pipeline for many questions.
+
+        Context for all questions is retrieved with one batched
+        ``VectorStore.query`` (so one embedding call), then the answers are
+        generated concurrently, ``max_workers`` at a time. Each question
+        still gets its own Run, with the usual retrieve, augment and
+        generate snapshots.
+
+        Args:
+            questions (List[str]): Questions to answer
+            max_workers (int): Answers generated concurrently
+
+        Returns:
+            List[Run]: One Run per question, in the order of ``questions``
+
+        Example:
+            >>> runs = rag.batch(["Who published Gran Turismo?", "When was Pokemon Gold released?"])
+            >>> answers = [run.get_final_state()["answer"] for run in runs]
+        """
+        if not questions:
+            return []
+        retrieved = self._search(self.resource.vars.get("vector_store"), questions)
+
+        def run(question: str, update: RAGState) -> Run:
+            return self.workflow.run(
+                state={"question": question},
+                resource=Resource(vars={**self.resource.vars, "retrieved": update}),
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(run, questions, retrieved))
@@ -0,0 +1,101 @@
+from typing import List, Optional
+
+from lib.bm25 import tokenize
+from lib.context import Tokenizer, approximate_token_count
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextSelector:
+    """
+    Choose which retrieved documents go into a RAG prompt.
+
+    Retrieval over-fetches ``n_candidates`` documents, and the selector then:
+    1. Drops candidates farther than ``max_distance`` from the question
+    2. Orders the rest by maximal marginal relevance (MMR), trading
+       relevance (from the distances) against similarity to the documents
+       already chosen, and drops near-duplicates outright
+    3. Packs them, in that order, into ``max_tokens``; a document that does
+       not fit is skipped so smaller ones after it can still be used
+
+    Similarity between documents is the Jaccard overlap of their word sets,
+    so no embeddings are needed and cached retrievals can be re-ranked too.
+
+    Args:
+        max_tokens: Token budget of the packed context
+        n_candidates: Documents retrieved per question before selection
+        max_distance: Optional distance cutoff, in the store's vector
+            distance metric. Only meaningful for dense retrieval: lexical and
+            hybrid results (and locally filtered ones, see ``QueryPlan``)
+            carry relative distances, where the best match is always 0
+        mmr_lambda: Weight of relevance vs. novelty (1.0 = relevance only)
+        duplicate_threshold: Similarity above which a candidate counts as a
+            duplicate of one already chosen
+        max_documents: Optional cap on the number of documents chosen
+        tokenizer: Token counting function (default: ~4 characters per token)
+
+    Example:
+        >>> selector = ContextSelector(max_tokens=1500, max_distance=0.6)
+        >>> rag = RAG(llm, store, context_selector=selector)
+    """
+
+    def __init__(self,
+                 max_tokens: int = 2000,
+                 n_candidates: int = 20,
+                 max_distance: Optional[float] = None,
+                 mmr_lambda: float = 0.7,
+                 duplicate_threshold: float = 0.9,
+                 max_documents: Optional[int] = None,
+                 tokenizer: Optional[Tokenizer] = None):
+        self.max_tokens = max_tokens
+        self.n_candidates = n_candidates
+        self.max_distance = max_distance
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+        self.max_documents = max_documents
+        self.tokenizer = tokenizer or approximate_token_count
+
+    def select(self, documents: List[str], distances: List[float]) -> List[int]:
+        """
+        Indices of the documents to use, in the order they should appear.
+
+        Args:
+            documents: Retrieved documents, best first
+            distances: Their distances to the question
+        """
+        candidates = [
+            i for i, distance in enumerate(distances)
+            if self.max_distance is None or distance <= self.max_distance
+        ]
+        if not candidates:
+            return []
+
+        # Relevance in [0, 1]: the closest candidate scores 1, the farthest 0
+        closest = min(distances[i] for i in candidates)
+        spread = max(distances[i] for i in candidates) - closest
+        relevance = {i: 1.0 - (distances[i] - closest) / spread if spread else 1.0 for i in candidates}
+        words = {i: frozenset(tokenize(documents[i])) for i in candidates}
+
+        selected: List[int] = []
+        # Highest similarity of each candidate to the documents selected so far
+        redundancy = {i: 0.0 for i in candidates}
+        budget = self.max_tokens
+        while redundancy and (self.max_documents is None or len(selected) < self.max_documents):
+            best = max(redundancy, key=lambda i: (
+                self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * redundancy[i], -i
+            ))
+            if redundancy.pop(best) >= self.duplicate_threshold:
+                continue
+            tokens = self.tokenizer(documents[best])
+            if tokens > budget:
+                continue
+            budget -= tokens
+            selected.append(best)
+            for i in redundancy:
+                redundancy[i] = max(redundancy[i], _jaccard(words[i], words[best]))
+        return selected
+
@@ -0,0 +1,251 @@
+from typing import List, Optional
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+import pickle
+import sqlite3
+import threading
+
+from lib.state_machine import Run, Snapshot
+
+
+class RunStore(ABC):
+    """
+    Persistent, append-only storage for state machine runs.
+
+    Snapshots are written incrementally as a run produces them (pass
+    ``store.snapshot_writer(session_id)`` as the ``on_snapshot`` callback of
+    ``StateMachine.run``), so history survives restarts and does not have to
+    live in process memory. The last run of the most recently used sessions
+    is kept in a bounded in-memory LRU so follow-up turns avoid a disk read.
+
+    Backends implement the ``_write_*`` / ``_read_*`` / ``_delete_*`` methods.
+    """
+
+    def __init__(self, max_hot_sessions: int = 128):
+        self.max_hot_sessions = max_hot_sessions
+        self._hot: "OrderedDict[str, Run]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def snapshot_writer(self, session_id: str):
+        """Build an ``on_snapshot`` callback that streams snapshots to this store"""
+        def on_snapshot(run: Run, snapshot: Snapshot):
+            self.add_snapshot(session_id, run, snapshot)
+        return on_snapshot
+
+    def add_snapshot(self, session_id: str, run: Run, snapshot: Snapshot):
+        """Append the latest snapshot of a run, registering the run on the first one"""
+        with self._lock:
+            index = len(run.snapshots) - 1
+            if index == 0:
+                self._write_run(session_id, run)
+            self._write_snapshot(run.run_id, index, snapshot)
+
+    def complete_run(self, session_id: str, run: Run):
+        """Mark a run as complete and make it the hot run of its session"""
+        with self._lock:
+            if not run.snapshots:
+                self._write_run(session_id, run)
+            self._write_completion(run)
+            self._touch(session_id, run)
+
+    def save_run(self, session_id: str, run: Run):
+        """Write a whole run at once, e.g. one that was recorded in memory"""
+        with self._lock:
+            self._write_run(session_id, run)
+            for index, snapshot in enumerate(run.snapshots):
+                self._write_snapshot(run.run_id, index, snapshot)
+            self._write_completion(run)
+
+    def spill(self, session_id: str, runs: List[Run]):
+        """Eviction hook for ShortTermMemory: persist runs evicted from memory
+
+        Example:
+            >>> memory = ShortTermMemory(max_objects_per_session=20, on_evict=store.spill)
+        """
+        for run in runs:
+            self.save_run(session_id, run)
+
+    def get_last_run(self, session_id: str) -> Optional[Run]:
+        """Get the most recent run of a session, from the LRU if it is hot"""
+        with self._lock:
+            if session_id in self._hot:
+                self._hot.move_to_end(session_id)
+                return self._hot[session_id]
+            runs = self._read_runs(session_id, offset=0, limit=1, newest_first=True)
+            if not runs:
+                return None
+            self._touch(session_id, runs[0])
+            return runs[0]
+
+    def get_runs(self, session_id: str, offset: int = 0,
+                 limit: Optional[int] = None) -> List[Run]:
+        """Page through the runs of a session, oldest first"""
+        with self._lock:
+            return self._read_runs(session_id, offset=offset, limit=limit)
+
+    def get_sessions(self) -> List[str]:
+        with self._lock:
+            return self._read_sessions()
+
+    def delete_session(self, session_id: str):
+        with self._lock:
+            self._hot.pop(session_id, None)
+            self._delete_session(session_id)
+
+    def _touch(self, session_id: str, run: Run):
+        self._hot[session_id] = run
+        self._hot.move_to_end(session_id)
+        while len(self._hot) > self.max_hot_sessions:
+            self._hot.popitem(last=False)
+
+    @abstractmethod
+    def _write_run(self, session_id: str, run: Run):
+        pass
+
+    @abstractmethod
+    def _write_snapshot(self, run_id: str, index: int, snapshot: Snapshot):
+        pass
+
+    @abstractmethod
+    def _write_completion(self, run: Run):
+        pass
+
+    @abstractmethod
+    def _read_runs(self, session_id: str, offset: int = 0, limit: Optional[int] = None,
+                   newest_first: bool = False) -> List[Run]:
+        pass
+
+    @abstractmethod
+    def _read_sessions(self) -> List[str]:
+        pass
+
+    @abstractmethod
+    def _delete_session(self, session_id: str):
+        pass
+
+
+class SQLiteRunStore(RunStore):
+    """
+    RunStore backed by a single SQLite file.
+
+    Each snapshot is stored as its own row holding the pickled delta (or the
+    full state for keyframes), so a step that changes one field only writes
+    that field. Runs are rebuilt lazily, one page at a time.
+
+    Example:
+        >>> store = SQLiteRunStore("runs.sqlite3")
+        >>> agent = Agent("gpt-4o-mini", "You are helpful", run_store=store)
+    """
+
+    def __init__(self, path: str = "runs.sqlite3", max_hot_sessions: int = 128):
+        super().__init__(max_hot_sessions=max_hot_sessions)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT UNIQUE NOT NULL,
+                session_id TEXT NOT NULL,
+                start_timestamp TEXT NOT NULL,
+                end_timestamp TEXT,
+                keyframe_interval INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS runs_session ON runs (session_id, seq);
+            CREATE TABLE IF NOT EXISTS snapshots (
+                run_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                snapshot_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                step_id TEXT NOT NULL,
+                is_keyframe INTEGER NOT NULL,
+                state_schema BLOB NOT NULL,
+                delta BLOB NOT NULL,
+                PRIMARY KEY (run_id, idx)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def __repr__(self):
+        return f"SQLiteRunStore('{self.path}')"
+
+    def close(self):
+        self._conn.close()
+
+    def _write_run(self, session_id: str, run: Run):
+        self._conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, session_id, start_timestamp, keyframe_interval) "
+            "VALUES (?, ?, ?, ?)",
+            (run.run_id, session_id, run.start_timestamp.isoformat(), run.keyframe_interval),
+        )
+        self._conn.commit()
+
+    def _write_snapshot(self, run_id: str, index: int, snapshot: Snapshot):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                index,
+                snapshot.snapshot_id,
+                snapshot.timestamp.isoformat(),
+                snapshot.step_id,
+                int(snapshot.is_keyframe),
+                pickle.dumps(snapshot.state_schema),
+                pickle.dumps(snapshot.delta),
+            ),
+        )
+        self._conn.commit()
+
+    def _write_completion(self, run: Run):
+        end = run.end_timestamp.isoformat() if run.end_timestamp else None
+        self._conn.execute("UPDATE runs SET end_timestamp = ? WHERE run_id = ?", (end, run.run_id))
+        self._conn.commit()
+
+    def _read_runs(self, session_id: str, offset: int = 0, limit: Optional[int] = None,
+                   newest_first: bool = False) -> List[Run]:
+        order = "DESC" if newest_first else "ASC"
+        rows = self._conn.execute(
+            "SELECT run_id, start_timestamp, end_timestamp, keyframe_interval FROM runs "
+            f"WHERE session_id = ? ORDER BY seq {order} LIMIT ? OFFSET ?",
+            (session_id, -1 if limit is None else limit, offset),
+        ).fetchall()
+        return [self._load_run(*row) for row in rows]
+
+    def _load_run(self, run_id: str, start: str, end: Optional[str], keyframe_interval: int) -> Run:
+        run = Run(
+            run_id=run_id,
+            start_timestamp=datetime.fromisoformat(start),
+            end_timestamp=datetime.fromisoformat(end) if end else None,
+            keyframe_interval=keyframe_interval,
+        )
+        rows = self._conn.execute(
+            "SELECT snapshot_id, timestamp, step_id, is_keyframe, state_schema, delta "
+            "FROM snapshots WHERE run_id = ? ORDER BY idx",
+            (run_id,),
+        ).fetchall()
+        for snapshot_id, timestamp, step_id, is_keyframe, state_schema, delta in rows:
+            run.add_snapshot(Snapshot(
+                snapshot_id=snapshot_id,
+                timestamp=datetime.fromisoformat(timestamp),
+                delta=pickle.loads(delta),
+                state_schema=pickle.loads(state_schema),
+                step_id=step_id,
+                parent=None if is_keyframe else run.snapshots[-1],
+            ))
+        return run
+
+    def _read_sessions(self) -> List[str]:
+        rows = self._conn.execute(
+            "SELECT session_id FROM runs GROUP BY session_id ORDER BY MIN(seq)"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _delete_session(self, session_id: str):
+        self._conn.execute(
+            "DELETE FROM snapshots WHERE run_id IN (SELECT run_id FROM runs WHERE session_id = ?)",
+            (session_id,),
+        )
+        self._conn.execute("DELETE FROM runs WHERE session_id = ?", (session_id,))
+        self._conn.commit()
@@ -0,0 +1,100 @@
+from typing import Any, Hashable, List, Optional, Sequence
+import threading
+
+import numpy as np
+
+from lib.llm_cache import CacheStats
+
+
+class SemanticCache:
+    """
+    LRU cache keyed by query embeddings.
+
+    A lookup is a hit when a cached query vector has a cosine similarity of
+    at least ``threshold`` with the new one, so near-duplicate questions
+    ("Who publishes Gran Turismo?" / "Who is the publisher of Gran
+    Turismo?") share an entry. Similarities to all cached vectors are
+    computed with a single matrix product.
+
+    Entries are tagged with a version, typically ``VectorStore.version``:
+    when a lookup or insert sees a new version, everything cached for the
+    old one is dropped, since the store it was computed from has changed.
+
+    Args:
+        threshold: Minimum cosine similarity for a hit
+        max_entries: Maximum number of entries before the least recently
+            used one is evicted
+
+    Example:
+        >>> cache = SemanticCache(threshold=0.95)
+        >>> cache.put(vector, ("ids", "documents", "distances"), store.version)
+        >>> cache.get(similar_vector, store.version)
+        ('ids', 'documents', 'distances')
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1024):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._values: List[Any] = [None] * max_entries
+        # Last use of each slot (0 for free slots), for LRU eviction
+        self._used = np.zeros(max_entries, dtype=np.int64)
+        self._clock = 0
+        self._version: Optional[Hashable] = None
+
+    def __len__(self):
+        return int(np.count_nonzero(self._used))
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._values = [None] * self.max_entries
+        self._used[:] = 0
+
+    def _check_version(self, version: Hashable):
+        if version != self._version:
+            self._clear()
+            self._version = version
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(self, vector: Sequence[float], version: Hashable = None) -> Optional[Any]:
+        """The value cached for the most similar query above the threshold, or None"""
+        query = self._normalize(vector)
+        with self._lock:
+            self._check_version(version)
+            slot = None
+            if self._vectors is not None and self._used.any():
+                similarities = np.where(self._used > 0, self._vectors @ query, -np.inf)
+                best = int(similarities.argmax())
+                if similarities[best] >= self.threshold:
+                    slot = best
+
+            if slot is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self._clock += 1
+            self._used[slot] = self._clock
+            return self._values[slot]
+
+    def put(self, vector: Sequence[float], value: Any, version: Hashable = None):
+        """Cache ``value`` for the query ``vector``, evicting the least recently used entry if full"""
+        query = self._normalize(vector)
+        with self._lock:
+            self._check_version(version)
+            if self._vectors is None or self._vectors.shape[1] != len(query):
+                self._vectors = np.zeros((self.max_entries, len(query)), dtype=np.float32)
+                self._clear()
+            slot = int(self._used.argmin())
+            self._clock += 1
+            self._vectors[slot] = query
+            self._values[slot] = value
+            self._used[slot] = self._clock
@@ -1,12 +1,70 @@
-from typing import Any, Callable, Dict, List, Optional, Union, TypeVar, Generic, cast, Type, TypedDict, get_type_hints
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union, TypeVar, Generic, cast, Type, TypedDict, Annotated, get_type_hints, get_origin
 from dataclasses import dataclass, field
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 import copy
+import asyncio
 import inspect
 
+from lib.frozen import FrozenDict, FrozenList, freeze, lazy_thaw, thaw
+
 
 StateSchema = TypeVar("StateSchema")
+Reducer = Callable[[Any, Any], Any]
+
+
+def get_reducers(state_schema: Type[StateSchema]) -> Dict[str, Reducer]:
+    """Collect the per-field reducers declared in a state schema.
+
+    Reducers are declared alongside the TypedDict fields with ``Annotated``,
+    e.g. ``documents: Annotated[List[str], operator.add]``. Every step update
+    goes through them, so a field accumulates the same way whether the steps
+    writing it ran in parallel or one after another.
+    """
+    reducers = {}
+    for name, hint in get_type_hints(state_schema, include_extras=True).items():
+        if get_origin(hint) is Annotated:
+            reducer = next((m for m in hint.__metadata__ if callable(m)), None)
+            if reducer:
+                reducers[name] = reducer
+    return reducers
+
+
+def merge_updates(state: StateSchema, updates: List[Dict], reducers: Dict[str, Reducer]) -> List[StateSchema]:
+    """Merge the partial updates of one or more steps into the shared state.
+
+    Updates are applied in order. Fields with a reducer are combined with
+    ``reducer(current, update)``; any other field may only be written with
+    a single value across all branches.
+
+    Returns:
+        The cumulative state after applying each update, so the last item
+        is the fully merged state.
+    """
+    written: Dict[str, Any] = {}
+    for update in updates:
+        for field_name, value in update.items():
+            if field_name in reducers:
+                continue
+            if field_name in written and written[field_name] != value:
+                raise ValueError(
+                    f"Parallel steps wrote conflicting values to '{field_name}'. "
+                    f"Declare a reducer with Annotated[<type>, <reducer>] in the state schema."
+                )
+            written[field_name] = value
+
+    merged = {**state}
+    states = []
+    for update in updates:
+        for field_name, value in update.items():
+            reducer = reducers.get(field_name)
+            if reducer and merged.get(field_name) is not None:
+                merged[field_name] = reducer(merged[field_name], value)
+            else:
+                merged[field_name] = value
+        states.append(cast(StateSchema, {**merged}))
+    return states
 
 @dataclass
 class Resource:
@@ -34,28 +92,81 @@ class Step(Generic[StateSchema]):
             # For regular functions
             return self.logic.__code__.co_argcount
 
-    def run(self, state: StateSchema, state_schema: Type[StateSchema], resource: Resource=None) -> StateSchema:
+    @property
+    def is_async(self) -> bool:
+        """Whether the step logic is a coroutine function"""
+        return inspect.iscoroutinefunction(self.logic)
+
+    def _call_logic(self, state: StateSchema, resource: Resource=None) -> Any:
         # Call logic function with appropriate number of arguments
         if self.logic_params_count == 1:
-            result = self.logic(state)
+            return self.logic(state)
         elif self.logic_params_count == 2:
-            result = self.logic(state, resource)
+            return self.logic(state, resource)
         else:
             raise ValueError(
                 f"Step '{self.step_id}' logic function must accept either 1 argument (state) "
                 f"or 2 arguments (state, resource). Found {self.logic_params_count} arguments."
             ) 
+
+    def _filter_result(self, result: Dict, state_schema: Type[StateSchema]) -> Dict:
         # Get expected fields from the TypedDict
         expected_fields = get_type_hints(state_schema)
-        
-        # Create new state with all fields from state_schema
-        # Only copy fields that are defined in state_schema
-        updated = {**state}
-        for field, value in result.items():
-            if field in expected_fields:
-                updated[field] = value
-        
-        return cast(StateSchema, updated)
+
+        # Only keep fields that are defined in state_schema
+        return {
+            field: value for field, value in result.items()
+            if field in expected_fields
+        }
+
+    def execute(self, state: StateSchema, state_schema: Type[StateSchema], resource: Resource=None) -> Dict:
+        """Run the step logic and return only the schema fields it updated.
+
+        Coroutine logic is driven to completion on a fresh event loop. That
+        is not possible inside a running loop (e.g. a notebook cell), where
+        the workflow must be awaited with ``arun`` instead.
+        """
+        result = self._call_logic(state, resource)
+        if inspect.isawaitable(result):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                result = asyncio.run(result)
+            else:
+                if inspect.iscoroutine(result):
+                    result.close()
+                raise RuntimeError(
+                    f"Step '{self.step_id}' is async and an event loop is already running; "
+                    f"use 'await StateMachine.arun(...)' instead of 'run'"
+                )
+        return self._filter_result(result, state_schema)
+
+    async def aexecute(self, state: StateSchema, state_schema: Type[StateSchema], resource: Resource=None) -> Dict:
+        """Async counterpart of ``execute``.
+
+        Coroutine logic is awaited on the running loop, while sync logic is
+        offloaded to a worker thread so blocking I/O does not stall the loop.
+        """
+        if self.is_async:
+            result = await self._call_logic(state, resource)
+        else:
+            result = await asyncio.to_thread(self._call_logic, state, resource)
+        return self._filter_result(result, state_schema)
+
+    def run(self, state: StateSchema, state_schema: Type[StateSchema], resource: Resource=None,
+            reducers: Optional[Dict[str, Reducer]] = None) -> StateSchema:
+        # The step gets a mutable copy of the state (its containers are only
+        # copied when read); in-place changes are kept and the returned fields
+        # are merged on top through the reducers
+        updated = lazy_thaw(state)
+        update = self.execute(cast(StateSchema, updated), state_schema, resource)
+        return merge_updates(cast(StateSchema, updated), [update], reducers or {})[0]
+
+    async def arun(self, state: StateSchema, state_schema: Type[StateSchema], resource: Resource=None,
+                   reducers: Optional[Dict[str, Reducer]] = None) -> StateSchema:
+        updated = lazy_thaw(state)
+        update = await self.aexecute(cast(StateSchema, updated), state_schema, resource)
+        return merge_updates(cast(StateSchema, updated), [update], reducers or {})[0]
 
 
 class EntryPoint(Step[StateSchema]):
@@ -97,14 +208,58 @@ class Transition(Generic[StateSchema]):
         return self.targets
 
 
+@dataclass(frozen=True)
+class Appended:
+    """Delta for a list field that only grew: the items added at the end"""
+    items: Tuple[Any, ...]
+
+
+def diff_states(previous: Dict, current: Dict) -> Dict:
+    """Compute the field-level delta that turns ``previous`` into ``current``.
+
+    Both states are expected to be frozen, so unchanged fields are the same
+    object and are skipped by an identity check. A list that kept its
+    previous items as a prefix is encoded as ``Appended``.
+    """
+    delta = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if key in previous and old is value:
+            continue
+        # The prefix comparison runs in C and short-circuits on identical items
+        if (isinstance(old, list) and isinstance(value, list) and len(value) >= len(old)
+                and list.__getitem__(value, slice(0, len(old))) == old):
+            delta[key] = Appended(tuple(value[len(old):]))
+        else:
+            delta[key] = value
+    return delta
+
+
+def apply_delta(state: Dict, delta: Dict) -> FrozenDict:
+    """Apply a delta produced by ``diff_states`` and return the frozen result"""
+    updated = dict(state)
+    for key, value in delta.items():
+        if isinstance(value, Appended):
+            updated[key] = freeze(state[key]) + list(value.items)
+        else:
+            updated[key] = value
+    return FrozenDict(updated)
+
+
 @dataclass
 class Snapshot(Generic[StateSchema]):
-    """Represents a single state snapshot in time"""
+    """Represents a single state snapshot in time
+
+    Keyframe snapshots store the full (frozen) state. Other snapshots only
+    store the field-level ``delta`` against their ``parent`` and rebuild
+    ``state_data`` on demand from the nearest keyframe.
+    """
     snapshot_id: str
     timestamp: datetime
-    state_data: StateSchema
+    delta: Dict[str, Any]
     state_schema: Type[StateSchema]
     step_id: str
+    parent: Optional['Snapshot[StateSchema]'] = field(default=None, repr=False)
 
     def __str__(self) -> str:
         return f"Snapshot('{self.snapshot_id}') @ [{self.timestamp.strftime('%Y-%m-%d %H:%M:%S.%f')}]: {self.step_id}.State({self.state_data})"
@@ -115,22 +270,71 @@ class Snapshot(Generic[StateSchema]):
     @classmethod
     def create(cls, state_data: StateSchema, state_schema: Type[StateSchema],
                step_id:str) -> 'Snapshot[StateSchema]':
+        """Create a keyframe snapshot holding the full state"""
         return cls(
             snapshot_id=str(uuid.uuid4()),
             timestamp=datetime.now(),
-            state_data=state_data,
+            delta=freeze(state_data),
             state_schema=state_schema,
             step_id=step_id,
         )
 
+    @classmethod
+    def create_delta(cls, delta: Dict[str, Any], state_schema: Type[StateSchema],
+                     step_id: str, parent: 'Snapshot[StateSchema]') -> 'Snapshot[StateSchema]':
+        """Create a snapshot storing only the changes against ``parent``"""
+        return cls(
+            snapshot_id=str(uuid.uuid4()),
+            timestamp=datetime.now(),
+            delta=freeze(delta),
+            state_schema=state_schema,
+            step_id=step_id,
+            parent=parent,
+        )
+
+    @property
+    def is_keyframe(self) -> bool:
+        return self.parent is None
+
+    @property
+    def state_data(self) -> StateSchema:
+        """Full state at this snapshot, rebuilt from the nearest keyframe"""
+        chain = []
+        snapshot = self
+        while snapshot is not None:
+            chain.append(snapshot)
+            snapshot = snapshot.parent
+
+        state: Dict = {}
+        for snapshot in reversed(chain):
+            state = snapshot.apply(state)
+        return cast(StateSchema, state)
+
+    def apply(self, state: Dict) -> FrozenDict:
+        """Apply this snapshot on top of its parent's state"""
+        if self.is_keyframe:
+            return self.delta
+        return apply_delta(state, self.delta)
+
+    def __deepcopy__(self, memo):
+        # Snapshots are immutable, so copies can share them
+        return self
+
 
 @dataclass
 class Run(Generic[StateSchema]):
-    """Represents a single execution run of the state machine"""
+    """Represents a single execution run of the state machine
+
+    Snapshots are delta-encoded against the previous one, with a full
+    keyframe every ``keyframe_interval`` snapshots to bound reconstruction.
+    """
     run_id: str
     start_timestamp: datetime
     snapshots: List[Snapshot[StateSchema]] = field(default_factory=list)
     end_timestamp: Optional[datetime] = None
+    keyframe_interval: int = 10
+    # Latest frozen state while the run is being recorded
+    _head_state: Optional[FrozenDict] = field(default=None, init=False, repr=False, compare=False)
 
     def __str__(self) -> str:
         return f"Run('{self.run_id}')"
@@ -139,10 +343,11 @@ class Run(Generic[StateSchema]):
         return self.__str__()
 
     @classmethod
-    def create(cls) -> 'Run[StateSchema]':
+    def create(cls, keyframe_interval: int = 10) -> 'Run[StateSchema]':
         return cls(
             run_id=str(uuid.uuid4()),
-            start_timestamp=datetime.now()
+            start_timestamp=datetime.now(),
+            keyframe_interval=keyframe_interval,
         )
 
     @property
@@ -154,26 +359,86 @@ class Run(Generic[StateSchema]):
             "snapshot_counts": len(self.snapshots)
         }
 
+    def __deepcopy__(self, memo):
+        # Snapshots are immutable; only the list holding them needs copying
+        run = copy.copy(self)
+        run.snapshots = list(self.snapshots)
+        return run
+
     def add_snapshot(self, snapshot: Snapshot[StateSchema]):
         """Add a new snapshot to this run"""
         self.snapshots.append(snapshot)
+        self._head_state = None
+
+    def record(self, state_data: StateSchema, state_schema: Type[StateSchema],
+               step_id: str) -> StateSchema:
+        """Add a snapshot for ``state_data``, delta-encoded against the previous one
+
+        Returns:
+            The frozen state that was recorded
+        """
+        previous = self._head_state
+        if previous is None and self.snapshots:
+            previous = self.snapshots[-1].state_data
+        state = freeze(state_data, previous)
+
+        if previous is None or len(self.snapshots) % self.keyframe_interval == 0:
+            snapshot = Snapshot.create(state, state_schema, step_id)
+        else:
+            delta = diff_states(previous, state)
+            snapshot = Snapshot.create_delta(delta, state_schema, step_id, self.snapshots[-1])
+
+        self.add_snapshot(snapshot)
+        self._head_state = state
+        return cast(StateSchema, state)
+
+    def iter_states(self) -> Iterator[StateSchema]:
+        """Stream the full state of every snapshot in order.
+
+        Deltas are applied incrementally, so the whole history is replayed in
+        a single pass instead of rebuilding each snapshot from its keyframe.
+        """
+        state: Dict = {}
+        for snapshot in self.snapshots:
+            state = snapshot.apply(state)
+            yield cast(StateSchema, state)
 
     def complete(self):
         """Mark this run as complete"""
         self.end_timestamp = datetime.now()
+        self._head_state = None
 
     def get_final_state(self) -> Optional[StateSchema]:
         """Get the final state of this run"""
         if not self.snapshots:
             return None
-        return self.snapshots[-1].state_data
+        state = self._head_state or self.snapshots[-1].state_data
+        # Mutable copy so callers can modify it without touching the snapshot
+        return cast(StateSchema, thaw(state))
+
+
+SnapshotCallback = Callable[[Run, Snapshot], None]
 
 
 class StateMachine(Generic[StateSchema]):
-    def __init__(self, state_schema: Type[StateSchema]):
+    def __init__(self, state_schema: Type[StateSchema], max_workers: Optional[int] = None):
+        """
+        Initialize a StateMachine
+
+        Args:
+            state_schema: TypedDict describing the workflow state. Fields may
+                declare a reducer with ``Annotated[<type>, <reducer>]``, which
+                combines every step's update with the current value
+            max_workers: Maximum number of threads used to run parallel
+                branches (default: one per branch)
+        """
         self.state_schema = state_schema
+        self.max_workers = max_workers
+        self.reducers = get_reducers(state_schema)
         self.steps: Dict[str, Step[StateSchema]] = {}
         self.transitions: Dict[str, List[Transition[StateSchema]]] = {}
+        # step_id -> ids of every step reachable from it, built on demand
+        self._reachable: Dict[str, Set[str]] = {}
 
     def __str__(self) -> str:
         schema_keys = list(get_type_hints(self.state_schema).keys())
@@ -200,8 +465,10 @@ class StateMachine(Generic[StateSchema]):
         if src_id not in self.transitions:
             self.transitions[src_id] = []
         self.transitions[src_id].append(transition)
+        self._reachable.clear()
 
-    def run(self, state: StateSchema, resource: Resource = None):
+    def _get_entry_point(self, state: StateSchema) -> str:
+        """Validate the initial state and return the id of the EntryPoint step"""
         # Validate that state has at least one field from the schema
         expected_fields = get_type_hints(self.state_schema)
         state_fields = set(state.keys())
@@ -215,43 +482,202 @@ class StateMachine(Generic[StateSchema]):
             raise Exception("No EntryPoint step found in workflow")
         if len(entry_points) > 1:
             raise Exception("Multiple EntryPoint steps found in workflow")
-        
-        # Create a new run for this execution
-        current_run = Run.create()
-        
-        current_step_id = entry_points[0].step_id        
+        return entry_points[0].step_id
 
-        while current_step_id:
-            step = self.steps[current_step_id]
+    def _active_steps(self, frontier: List[str]) -> List[Step[StateSchema]]:
+        """Resolve the frontier to steps, dropping (and reporting) terminations"""
+        steps = [self.steps[step_id] for step_id in frontier]
+        for step in steps:
             if isinstance(step, Termination):
-                print(f"[StateMachine] Terminating: {current_step_id}")
+                print(f"[StateMachine] Terminating: {step.step_id}")
+        return [step for step in steps if not isinstance(step, Termination)]
+
+    def _record_step(self, run: Run[StateSchema], step: Step[StateSchema], state: StateSchema) -> StateSchema:
+        """Snapshot the state after a step and return the frozen state"""
+        if isinstance(step, EntryPoint):
+            print(f"[StateMachine] Starting: {step.step_id}")
+        else:
+            print(f"[StateMachine] Executing step: {step.step_id}")
+
+        # Create and add snapshot to the current run
+        return run.record(state, self.state_schema, step.step_id)
+
+    def _fan_in(self, run: Run[StateSchema], steps: List[Step[StateSchema]], state: StateSchema,
+                updates: List[Dict]) -> Iterator[Tuple[StateSchema, Snapshot[StateSchema]]]:
+        """Merge parallel branch updates, yielding (state, snapshot) as each branch is recorded"""
+        # Each branch snapshot holds the state merged up to that branch,
+        # so the last one is the joined state. Yielding after every record
+        # lets consumers see each snapshot before the next one is added.
+        merged_states = merge_updates(state, updates, self.reducers)
+        for step, merged_state in zip(steps, merged_states):
+            state = run.record(merged_state, self.state_schema, step.step_id)
+            yield state, run.snapshots[-1]
+
+    def _reachable_from(self, step_id: str) -> Set[str]:
+        """Ids of all steps reachable from ``step_id`` through any transition target"""
+        if step_id not in self._reachable:
+            seen: Set[str] = set()
+            pending = [step_id]
+            while pending:
+                for t in self.transitions.get(pending.pop(), []):
+                    for target in t.targets:
+                        if target not in seen:
+                            seen.add(target)
+                            pending.append(target)
+            self._reachable[step_id] = seen
+        return self._reachable[step_id]
+
+    def _schedule(self, candidates: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Split candidate steps into the next superstep and the steps held back.
+
+        A step is held back while another candidate can still reach it, so a
+        join waits for every pending branch (however many steps each one
+        still has to run) and then executes once. Steps on a common cycle
+        do not wait for each other.
+        """
+        candidates = list(dict.fromkeys(candidates))
+        waiting = [
+            step_id for step_id in candidates
+            if any(
+                step_id in self._reachable_from(other) and other not in self._reachable_from(step_id)
+                for other in candidates if other != step_id
+            )
+        ]
+        if len(waiting) == len(candidates):
+            return candidates, []
+        return [step_id for step_id in candidates if step_id not in waiting], waiting
+
+    def _next_frontier(self, steps: List[Step[StateSchema]], state: StateSchema) -> List[str]:
+        next_steps: List[str] = []
+        for step in steps:
+            step_next: List[str] = []
+            for t in self.transitions.get(step.step_id, []):
+                step_next += t.resolve(state)
+
+            if not step_next:
+                raise Exception(f"[StateMachine] No transitions found from step: {step.step_id}")
+            next_steps += step_next
+
+        return next_steps
+
+    def _iter_run(self, run: Run[StateSchema], state: StateSchema,
+                  resource: Resource = None) -> Iterator[Snapshot[StateSchema]]:
+        """Execute the workflow into ``run``, yielding each snapshot as it is recorded"""
+        entry_point = self._get_entry_point(state)
+
+        # Steps to execute in the current superstep. A transition resolving
+        # to several targets fans out into parallel branches; steps that
+        # other branches can still reach wait until those branches arrive.
+        frontier: List[str] = [entry_point]
+        waiting: List[str] = []
+
+        while frontier:
+            steps = self._active_steps(frontier)
+            if not steps:
                 break
-            
-            # Replace state entirely
-            state = step.run(state, self.state_schema, resource)  
 
-            if isinstance(step, EntryPoint):
-                print(f"[StateMachine] Starting: {current_step_id}")
+            if len(steps) == 1:
+                state = steps[0].run(state, self.state_schema, resource, self.reducers)
+                state = self._record_step(run, steps[0], state)
+                yield run.snapshots[-1]
             else:
-                print(f"[StateMachine] Executing step: {current_step_id}")
+                print(f"[StateMachine] Executing steps in parallel: {[step.step_id for step in steps]}")
+                updates = self._run_parallel(steps, state, resource)
+                for state, snapshot in self._fan_in(run, steps, state, updates):
+                    yield snapshot
 
-            # Create and add snapshot to the current run
-            snapshot = Snapshot.create(copy.deepcopy(state), self.state_schema, current_step_id)
-            current_run.add_snapshot(snapshot)
+            frontier, waiting = self._schedule(self._next_frontier(steps, state) + waiting)
 
-            transitions = self.transitions.get(current_step_id, [])
-            next_steps: List[str] = []
+        run.complete()
 
-            for t in transitions:
-                next_steps += t.resolve(state)
+    async def _aiter_run(self, run: Run[StateSchema], state: StateSchema,
+                         resource: Resource = None) -> AsyncIterator[Snapshot[StateSchema]]:
+        entry_point = self._get_entry_point(state)
+        frontier: List[str] = [entry_point]
+        waiting: List[str] = []
 
-            if not next_steps:
-                raise Exception(f"[StateMachine] No transitions found from step: {current_step_id}")
+        while frontier:
+            steps = self._active_steps(frontier)
+            if not steps:
+                break
 
-            if len(next_steps) > 1:
-                raise NotImplementedError("Parallel execution not implemented yet.")
+            if len(steps) == 1:
+                state = await steps[0].arun(state, self.state_schema, resource, self.reducers)
+                state = self._record_step(run, steps[0], state)
+                yield run.snapshots[-1]
+            else:
+                print(f"[StateMachine] Executing steps in parallel: {[step.step_id for step in steps]}")
+                updates = await asyncio.gather(*[
+                    step.aexecute(cast(StateSchema, lazy_thaw(state)), self.state_schema, resource)
+                    for step in steps
+                ])
+                for state, snapshot in self._fan_in(run, steps, state, list(updates)):
+                    yield snapshot
+
+            frontier, waiting = self._schedule(self._next_frontier(steps, state) + waiting)
+
+        run.complete()
+
+    def stream(self, state: StateSchema, resource: Resource = None) -> Iterator[Snapshot[StateSchema]]:
+        """
+        Execute the workflow, yielding each snapshot as soon as its step finishes
+
+        Example:
+            >>> for snapshot in workflow.stream(initial_state):
+            ...     print(snapshot.step_id, snapshot.state_data)
+        """
+        return self._iter_run(Run.create(), state, resource)
+
+    def astream(self, state: StateSchema, resource: Resource = None) -> AsyncIterator[Snapshot[StateSchema]]:
+        """Async counterpart of ``stream``, consumed with ``async for``"""
+        return self._aiter_run(Run.create(), state, resource)
+
+    def run(self, state: StateSchema, resource: Resource = None,
+            on_snapshot: Optional[SnapshotCallback] = None):
+        """
+        Execute the workflow from its EntryPoint until Termination
+
+        Args:
+            state: Initial state
+            resource: Optional resource passed to steps accepting two arguments
+            on_snapshot: Optional callback invoked with (run, snapshot) as soon
+                as each snapshot is recorded, e.g. to stream it to a RunStore
+
+        Returns:
+            The completed Run
+        """
+        # Create a new run for this execution
+        current_run = Run.create()
+        for snapshot in self._iter_run(current_run, state, resource):
+            if on_snapshot:
+                on_snapshot(current_run, snapshot)
+        return current_run
 
-            current_step_id = next_steps[0]
+    async def arun(self, state: StateSchema, resource: Resource = None,
+                   on_snapshot: Optional[SnapshotCallback] = None):
+        """Async counterpart of ``run``.
 
-        current_run.complete()
+        Coroutine steps are awaited on the running event loop and parallel
+        branches are gathered as tasks, so many runs can share one loop.
+        """
+        current_run = Run.create()
+        async for snapshot in self._aiter_run(current_run, state, resource):
+            if on_snapshot:
+                on_snapshot(current_run, snapshot)
         return current_run
+
+    def _run_parallel(self, steps: List[Step[StateSchema]], state: StateSchema,
+                      resource: Resource = None) -> List[Dict]:
+        """Run sibling steps on a thread pool and return their updates in step order.
+
+        Every branch receives its own mutable copy of the same input state;
+        only the fields a branch returns are merged.
+        """
+        max_workers = self.max_workers or len(steps)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(step.execute, cast(StateSchema, lazy_thaw(state)), self.state_schema, resource)
+                for step in steps
+            ]
+            return [future.result() for future in futures]
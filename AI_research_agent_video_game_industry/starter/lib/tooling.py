@@ -1,13 +1,17 @@
 import inspect
 import datetime
+import threading
+from collections import OrderedDict
 from typing import (
-    Any, Callable, 
+    Any, Callable, Dict, Tuple,
     Literal, Optional, Union, TypeAlias,
     get_type_hints, get_origin, get_args,
 )
 from functools import wraps
 from openai.types.chat.chat_completion_message_tool_call import ChatCompletionMessageToolCall
 
+from lib.frozen import freeze
+
 
 # Type alias for OpenAI's tool call implementation
 ToolCall: TypeAlias = ChatCompletionMessageToolCall
@@ -17,10 +21,13 @@ class Tool:
         self,
         func: Callable,
         name: Optional[str] = None,
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        timeout: Optional[float] = None
     ):
         self.func = func
         self.name = name or func.__name__
+        # Seconds an agent waits for this tool before reporting a timeout
+        self.timeout = timeout
         self.description = description or inspect.getdoc(func)
         self.signature = inspect.signature(func, eval_str=True)
         self.type_hints = get_type_hints(func)
@@ -30,6 +37,9 @@ class Tool:
             for key, param in self.signature.parameters.items()
         ]
 
+        # The schema never changes, so build it once
+        self._schema = freeze(self._build_schema())
+
     def _build_param_schema(self, name: str, param: inspect.Parameter):
         param_type = self.type_hints.get(name, str)
         schema = self._infer_json_schema_type(param_type)
@@ -82,7 +92,7 @@ class Tool:
 
         return {"type": mapping.get(typ, "string")}
 
-    def dict(self) -> dict:
+    def _build_schema(self) -> dict:
         return {
             "type": "function",
             "function": {
@@ -102,6 +112,15 @@ class Tool:
             }
         }
 
+    def dict(self) -> dict:
+        """OpenAI function schema of the tool (cached and immutable)"""
+        return self._schema
+
+    @property
+    def is_async(self) -> bool:
+        """Whether the tool function is a coroutine function"""
+        return inspect.iscoroutinefunction(self.func)
+
     def __call__(self, *args, **kwargs):
         return self.func(*args, **kwargs)
 
@@ -110,16 +129,39 @@ class Tool:
 
     @classmethod
     def from_func(cls, func: Callable):
-        return cls(func)
-
-
-
-def tool(func=None, *, name: str = None, description: str = None):
+        return _get_or_create_tool(func)
+
+
+# Tools keyed by (func, name, description, timeout), so the same function
+# wrapped by several agents shares one Tool and its schema. Bounded (least
+# recently used first), so tools built from short-lived functions are dropped.
+_TOOL_CACHE_SIZE = 1024
+_tool_cache: "OrderedDict[Tuple[Callable, Optional[str], Optional[str], Optional[float]], Tool]" = OrderedDict()
+_tool_cache_lock = threading.Lock()
+
+
+def _get_or_create_tool(func: Callable, name: Optional[str] = None,
+                        description: Optional[str] = None,
+                        timeout: Optional[float] = None) -> Tool:
+    key = (func, name, description, timeout)
+    with _tool_cache_lock:
+        cached = _tool_cache.get(key)
+        if cached is None:
+            cached = Tool(func, name=name, description=description, timeout=timeout)
+            _tool_cache[key] = cached
+            if len(_tool_cache) > _TOOL_CACHE_SIZE:
+                _tool_cache.popitem(last=False)
+        else:
+            _tool_cache.move_to_end(key)
+        return cached
+
+
+def tool(func=None, *, name: str = None, description: str = None, timeout: float = None):
     def wrapper(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
             return f(*args, **kwargs)
-        return Tool(f, name=name, description=description)
+        return _get_or_create_tool(f, name=name, description=description, timeout=timeout)
     
     # @tool ou @tool(name="foo")
     return wrapper(func) if func else wrapper
\ No newline at end of file
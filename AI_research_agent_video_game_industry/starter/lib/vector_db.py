@@ -1,12 +1,97 @@
-from typing import List, Optional, Dict, Any, Union
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Dict, Any, Tuple, Union
 from typing_extensions import TypedDict
-import chromadb
-from chromadb.utils import embedding_functions
-from chromadb.api.models.Collection import Collection as ChromaCollection
-from chromadb.api.types import EmbeddingFunction, QueryResult, GetResult
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import weakref
 
 from lib.loaders import PDFLoader
-from lib.documents import Document, Corpus
+from lib.bm25 import BM25Index, reciprocal_rank_fusion
+from lib.metadata_index import MetadataIndex, UnsupportedFilter
+from lib.documents import Chunker, Document, Corpus
+from lib.numpy_store import NumpyCollection
+
+if TYPE_CHECKING:
+    # chromadb is imported lazily: it is slow to import and not needed by
+    # stores backed by a NumpyCollection
+    from chromadb.api.models.Collection import Collection as ChromaCollection
+    from chromadb.api.types import EmbeddingFunction, QueryResult, GetResult
+
+
+DocumentInput = Union[Document, Corpus, List[Document], Iterable[Document]]
+# Called with (documents written, batches written) after each batch
+ProgressCallback = Callable[[int, int], None]
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a failed write may succeed if retried: embedding API network
+    errors, timeouts, rate limits and server errors, or a locked SQLite file"""
+    if isinstance(error, sqlite3.OperationalError):
+        return "locked" in str(error)
+    from lib.llm import is_transient_error
+    return is_transient_error(error)
+
+
+class _SharedIndexes:
+    """
+    Local indexes and write version of one collection, shared by every
+    VectorStore over it.
+
+    Managers hand out a new VectorStore per lookup, so keeping them per store
+    would leave the other stores' indexes and caches stale after a write.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # BM25 indexes keyed by the metadata fields indexed with the content
+        self.lexical: Dict[Tuple[str, ...], BM25Index] = {}
+        self.metadata: Optional[MetadataIndex] = None
+        # Bumped by every write, so caches of query results can tell they are stale
+        self.version = 0
+
+
+# Kept while any store of the collection is alive
+_shared_indexes: "weakref.WeakValueDictionary[Any, _SharedIndexes]" = weakref.WeakValueDictionary()
+_shared_indexes_lock = threading.Lock()
+
+
+def _indexes_for(collection: Any) -> _SharedIndexes:
+    # Chroma returns a new Collection object per lookup, so key by its id
+    key = getattr(collection, "id", None) or id(collection)
+    with _shared_indexes_lock:
+        indexes = _shared_indexes.get(key)
+        if indexes is None:
+            indexes = _SharedIndexes()
+            _shared_indexes[key] = indexes
+        return indexes
+
+
+@dataclass
+class QueryPlan:
+    """
+    How a filtered query is answered.
+
+    Strategies:
+        - "filter": the metadata index matches no more documents than were
+          asked for, so they are returned as-is
+        - "filter_then_rank": the matches are few enough to rank locally
+          with BM25
+        - "search": vector search with the filter applied by Chroma
+    No embedding call is made for "filter" and "filter_then_rank"; their
+    results are ordered lexically and their distances are relative BM25
+    scores, not vector distances. Both are only used when the store has a
+    ``filter_rank_limit``.
+    """
+    strategy: str
+    candidates: Optional[List[str]] = None
+    reason: str = ""
 
 
 class VectorStore:
@@ -23,22 +108,81 @@ class VectorStore:
     - Semantic similarity search with filtering capabilities
     - Metadata-based document retrieval
     - Automatic embedding generation via OpenAI
+    - Batched, concurrent ingestion of large or streamed corpora
+    - Lexical (BM25) and hybrid retrieval through a local inverted index
+    - Exact metadata filtering through local hash and sorted indexes, with a
+      planner choosing between filtering and vector search
+    - A Chroma collection or an in-process NumpyCollection as backend
+    - A ``version`` counter bumped by every write, for invalidating caches
+      of query results
     """
 
-    def __init__(self, chroma_collection: ChromaCollection):
+    DEFAULT_BATCH_SIZE = 128
+    QUERY_MODES = ("dense", "lexical", "hybrid")
+
+    def __init__(self, chroma_collection: "ChromaCollection",
+                 max_batch_size: Optional[int] = None,
+                 lexical_fields: Optional[List[str]] = None,
+                 filter_rank_limit: int = 0,
+                 embedding_function: Optional[Callable[[List[str]], Any]] = None):
+        """
+        Args:
+            chroma_collection: Collection backing the store
+            max_batch_size: Largest batch the Chroma client accepts; batches
+                are capped to it
+            lexical_fields: Metadata fields indexed for lexical search along
+                with the content, e.g. ["Name", "Publisher", "Genre"]
+            filter_rank_limit: Largest number of filter matches answered
+                locally (returned, or ranked with BM25) instead of by vector
+                search, skipping the embedding call. 0 (default) always uses
+                the vector search, so dense results keep vector ranking
+            embedding_function: Embedding function of the collection, used
+                by ``embed``; defaults to a NumpyCollection's own
+        """
         self._collection = chroma_collection
+        self.max_batch_size = max_batch_size
+        self.lexical_fields = lexical_fields or []
+        self.filter_rank_limit = filter_rank_limit
+        # BM25 indexes are shared with the other stores over this collection
+        self._indexes = _indexes_for(chroma_collection)
+        self._index_lock = self._indexes.lock
+        self.embedding_function = embedding_function or getattr(chroma_collection, "embedding_function", None)
+
+    @property
+    def version(self) -> int:
+        """Write counter of the collection, shared with the other stores over it"""
+        return self._indexes.version
 
-    def add(self, item: Union[Document, Corpus, List[Document]]):
+    def add(self, item: DocumentInput,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            max_workers: int = 4,
+            max_retries: int = 3,
+            on_progress: Optional[ProgressCallback] = None):
         """
         Add documents to the vector store with automatic embedding generation.
         
         This method accepts various input formats and normalizes them to the
         ChromaDB batch format. Documents are automatically embedded using the
         collection's configured embedding function (typically OpenAI).
+
+        Documents are written in batches of ``batch_size`` (capped to the
+        client's maximum), up to ``max_workers`` batches at a time so their
+        embedding requests overlap. At most ``2 * max_workers`` batches are
+        pending, so a generator is only consumed as fast as batches are
+        written. A failed batch is retried on its own, with exponential
+        backoff, before its error is raised.
         
         Args:
-            item (Union[Document, Corpus, List[Document]]): Documents to add.
-                Can be a single Document, a Corpus collection, or a list of Documents.
+            item (Union[Document, Corpus, List[Document], Iterable[Document]]):
+                Documents to add. Can be a single Document, a Corpus collection,
+                a list of Documents, or any iterable (e.g. a generator) of
+                Documents, which is consumed lazily
+            batch_size (int): Documents embedded and written per call
+            max_workers (int): Batches embedded and written concurrently
+            max_retries (int): Retries of a batch that failed with a transient
+                error (network, timeout, rate limit or server error)
+            on_progress (Callable[[int, int], None], optional): Called with the
+                number of documents and batches written so far
                 
         Raises:
             TypeError: If the input type is not supported or if a list contains
@@ -48,33 +192,281 @@ class VectorStore:
             >>> store.add(Document(content="AI is transforming healthcare"))
             >>> store.add([doc1, doc2, doc3])  # Batch add
             >>> store.add(Corpus([doc1, doc2]))  # Add corpus
+            >>> store.add(PDFLoader("report.pdf").iter_documents())  # Stream pages
+        """
+        self._write(self._collection.add, item, batch_size, max_workers, max_retries, on_progress)
+
+    def upsert(self, item: DocumentInput,
+               batch_size: int = DEFAULT_BATCH_SIZE,
+               max_workers: int = 4,
+               max_retries: int = 3,
+               on_progress: Optional[ProgressCallback] = None):
+        """
+        Add documents, replacing any stored documents with the same ids.
+
+        Accepts the same inputs and options as ``add``.
         """
+        self._write(self._collection.upsert, item, batch_size, max_workers, max_retries, on_progress)
+
+    def _write(self, write: Callable[..., None], item: DocumentInput,
+               batch_size: int, max_workers: int, max_retries: int,
+               on_progress: Optional[ProgressCallback]):
+        """Write batches concurrently with a bounded number pending"""
+        if self.max_batch_size:
+            batch_size = min(batch_size, self.max_batch_size)
+
+        written = {"documents": 0, "batches": 0}
+
+        def collect(pending: set) -> set:
+            """Wait for at least one pending batch and report it"""
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                written["documents"] += future.result()
+                written["batches"] += 1
+                if on_progress:
+                    on_progress(written["documents"], written["batches"])
+            return pending
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = set()
+            try:
+                for batch in self._batches(item, batch_size):
+                    pending.add(pool.submit(self._write_batch, write, batch, max_retries))
+                    # Backpressure: stop pulling documents while enough batches are queued
+                    while len(pending) >= 2 * max_workers:
+                        pending = collect(pending)
+                while pending:
+                    pending = collect(pending)
+            except BaseException:
+                # Don't start batches that are still queued
+                for future in pending:
+                    future.cancel()
+                raise
+
+    def _write_batch(self, write: Callable[..., None], batch: Corpus, max_retries: int,
+                     retry_delay: float = 1.0) -> int:
+        item_dict = batch.to_dict()
+        # Precomputed embeddings are only used when the whole batch has them
+        embeddings = item_dict["embeddings"]
+        if any(embedding is None for embedding in embeddings):
+            embeddings = None
+        for attempt in range(max_retries + 1):
+            try:
+                write(
+                    documents=item_dict["contents"],
+                    ids=item_dict["ids"],
+                    metadatas=item_dict["metadatas"],
+                    embeddings=embeddings,
+                )
+                self._index_documents(batch)
+                self._bump_version()
+                return len(item_dict["ids"])
+            except Exception as e:
+                if attempt == max_retries or not _is_transient(e):
+                    raise
+                print(f"Batch of {len(item_dict['ids'])} documents failed ({e}), retrying")
+                time.sleep(retry_delay * 2 ** attempt)
+
+    def delete(self, ids: Optional[List[str]] = None,
+               where: Optional[Dict[str, Any]] = None):
+        """
+        Delete documents by ID or metadata filter.
+
+        Example:
+            >>> store.delete(where={"source": "/data/old_report.pdf"})
+        """
+        if where is not None:
+            # Delete exactly the documents dropped from the local indexes
+            ids = self.get_ids(ids=ids, where=where)
+        if ids is not None and not ids:
+            return
+        self._collection.delete(ids=ids)
+        self._unindex(ids)
+        self._bump_version()
+
+    def _bump_version(self):
+        with self._index_lock:
+            self._indexes.version += 1
+
+    def embed(self, texts: List[str]) -> List[Any]:
+        """Embed texts with the collection's embedding function, e.g. to pass
+        them to ``query`` as ``query_embeddings``"""
+        if self.embedding_function is None:
+            raise ValueError("embed needs the embedding_function the VectorStore was created with")
+        return list(self.embedding_function(texts))
+
+    def get_ids(self, ids: Optional[List[str]] = None,
+                where: Optional[Dict[str, Any]] = None,
+                where_document: Optional[Dict[str, Any]] = None) -> List[str]:
+        """IDs of the stored documents matching the filters, without their content"""
+        return self._collection.get(ids=ids, where=where, where_document=where_document, include=[])["ids"]
+
+    @staticmethod
+    def _lexical_text(content: str, metadata: Optional[Dict[str, Any]], fields: Iterable[str]) -> str:
+        values = [str(metadata[f]) for f in fields if metadata and f in metadata]
+        return " ".join([content or "", *values])
+
+    def _iter_records(self) -> Iterator[tuple]:
+        """Yield (id, content, metadata) of every stored document, page by page"""
+        page_size = self.max_batch_size or 5000
+        offset = 0
+        while True:
+            page = self._collection.get(include=["documents", "metadatas"],
+                                        limit=page_size, offset=offset)
+            yield from zip(page["ids"], page["documents"], page["metadatas"])
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        """BM25 index of the store, built from the collection on first use
+        and kept in sync by ``add``, ``upsert`` and ``delete`` of every store
+        over the same collection"""
+        fields = tuple(self.lexical_fields)
+        with self._index_lock:
+            if fields not in self._indexes.lexical:
+                index = BM25Index()
+                index.add_many(
+                    (doc_id, self._lexical_text(content, metadata, fields))
+                    for doc_id, content, metadata in self._iter_records()
+                )
+                self._indexes.lexical[fields] = index
+            return self._indexes.lexical[fields]
+
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        """Metadata index of the store, built and kept in sync like ``lexical_index``"""
+        with self._index_lock:
+            if self._indexes.metadata is None:
+                index = MetadataIndex()
+                for doc_id, _, metadata in self._iter_records():
+                    index.add(doc_id, metadata)
+                self._indexes.metadata = index
+            return self._indexes.metadata
+
+    # Both run after the collection write, under the index lock: an index
+    # being built concurrently is either built after the write (and sees
+    # it) or is in place by the time the lock is acquired here
+
+    def _index_documents(self, documents: Iterable[Document]):
+        with self._index_lock:
+            lexical = list(self._indexes.lexical.items())
+            metadata = self._indexes.metadata
+            for doc in documents:
+                for fields, index in lexical:
+                    index.add(doc.id, self._lexical_text(doc.content, doc.metadata, fields))
+                if metadata is not None:
+                    metadata.add(doc.id, doc.metadata)
+
+    def _unindex(self, ids: List[str]):
+        with self._index_lock:
+            for doc_id in ids:
+                for index in self._indexes.lexical.values():
+                    index.remove(doc_id)
+                if self._indexes.metadata is not None:
+                    self._indexes.metadata.remove(doc_id)
+
+    def _filter_candidates(self, where: Optional[Dict[str, Any]],
+                           where_document: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        """Ids matching the filters (None without filters), from the metadata index when possible"""
+        if not where and not where_document:
+            return None
+        if where and not where_document:
+            try:
+                return sorted(self.metadata_index.filter(where))
+            except UnsupportedFilter:
+                pass
+        return self.get_ids(where=where, where_document=where_document)
+
+    def plan(self, where: Optional[Dict[str, Any]] = None,
+             where_document: Optional[Dict[str, Any]] = None,
+             n_results: int = 3) -> QueryPlan:
+        """
+        Choose how a dense query with these filters is answered.
+
+        Example:
+            >>> store.filter_rank_limit = 256
+            >>> store.plan(where={"$and": [{"Genre": "Racing"}, {"YearOfRelease": {"$lt": 2000}}]})
+            QueryPlan(strategy='filter', candidates=['001'], reason='1 match(es) <= n_results')
+        """
+        if not where:
+            return QueryPlan("search", reason="no metadata filter")
+        if self.filter_rank_limit <= 0:
+            return QueryPlan("search", reason="local filtering disabled (filter_rank_limit=0)")
+        if where_document:
+            return QueryPlan("search", reason="document filters are evaluated by Chroma")
+        try:
+            candidates = sorted(self.metadata_index.filter(where))
+        except UnsupportedFilter as e:
+            return QueryPlan("search", reason=str(e))
+
+        if len(candidates) > self.filter_rank_limit:
+            return QueryPlan("search", reason=f"{len(candidates)} matches > filter_rank_limit")
+        if len(candidates) <= n_results:
+            return QueryPlan("filter", candidates, f"{len(candidates)} match(es) <= n_results")
+        return QueryPlan("filter_then_rank", candidates,
+                         f"{len(candidates)} matches <= filter_rank_limit")
+
+    def _rank_candidates(self, text: str, candidates: List[str], n_results: int) -> List[tuple]:
+        """Rank filter matches with BM25; matches sharing no term keep id order after them"""
+        ranked = self.lexical_index.search(text, n_results, candidates)
+        seen = {doc_id for doc_id, _ in ranked}
+        rest = [(doc_id, 0.0) for doc_id in candidates if doc_id not in seen]
+        return (ranked + rest)[:n_results]
+
+    @staticmethod
+    def _batches(item: DocumentInput, batch_size: int) -> Iterator[Corpus]:
+        """Normalize the input to Documents and group them into non-empty batches"""
         if isinstance(item, Document):
-            item = Corpus([item])
+            item = [item]
         elif isinstance(item, list):
             if not all(isinstance(doc, Document) for doc in item):
                 raise TypeError("List must contain Document objects only.")
-            item = Corpus(item)
-        elif not isinstance(item, Corpus):
-            raise TypeError("item must be Document, Corpus, or List[Document].")
+        elif not isinstance(item, Iterable):
+            raise TypeError("item must be Document, Corpus, or an iterable of Documents.")
 
-        item_dict = item.to_dict()
-
-        self._collection.add(
-            documents=item_dict["contents"],
-            ids=item_dict["ids"],
-            metadatas=item_dict["metadatas"]
-        )
+        batch: List[Document] = []
+        for doc in item:
+            if not isinstance(doc, Document):
+                raise TypeError("Iterable must contain Document objects only.")
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield Corpus(batch)
+                batch = []
+        if batch:
+            yield Corpus(batch)
 
     def query(self, query_texts: str | List[str], n_results: int = 3,
               where: Optional[Dict[str, Any]] = None,
-              where_document: Optional[Dict[str, Any]] = None) -> QueryResult:
+              where_document: Optional[Dict[str, Any]] = None,
+              mode: str = "dense",
+              dense_weight: float = 1.0,
+              lexical_weight: float = 1.0,
+              rrf_k: int = 60,
+              lexical_shortcut: Optional[float] = None,
+              query_embeddings: Optional[List[Any]] = None) -> "QueryResult":
         """
         Perform semantic similarity search against stored documents.
         
         This method finds documents that are semantically similar to the query
         text using vector embeddings. Results are ranked by cosine similarity
         and can be filtered using metadata or document content conditions.
+
+        With a metadata filter and a ``filter_rank_limit``, a planner (see
+        ``plan``) first evaluates it against the local metadata index. When
+        few documents match they are returned or ranked with BM25, without
+        an embedding call (distances are then relative lexical scores);
+        otherwise the filtered vector search runs as usual.
+
+        ``mode="lexical"`` ranks with the local BM25 index instead, without an
+        embedding call. ``mode="hybrid"`` fuses the dense and lexical rankings
+        with weighted reciprocal rank fusion, so exact titles, publishers and
+        years rank well. In both modes the distances are ``1 - score / best
+        score`` (0 for the best match).
+
+        Several query texts are answered with a single collection query, so
+        all of them are embedded in one call.
         
         Args:
             query_texts (List[str]): List of query strings to search for
@@ -83,6 +475,16 @@ class VectorStore:
                 ChromaDB query syntax (e.g., {"author": "Smith"})
             where_document (Optional[Dict[str, Any]]): Document content filter
                 conditions using ChromaDB query syntax
+            mode (str): "dense" (default), "lexical" or "hybrid"
+            dense_weight (float): Weight of the dense ranking in hybrid mode
+            lexical_weight (float): Weight of the lexical ranking in hybrid mode
+            rrf_k (int): Rank offset of reciprocal rank fusion
+            lexical_shortcut (Optional[float]): In hybrid mode, answer from the
+                lexical ranking alone (skipping the embedding call) when its
+                best score is at least this many times the runner-up
+            query_embeddings (Optional[List]): Embeddings of the
+                query texts, when already computed (see ``embed``); the
+                texts are then not embedded again
                 
         Returns:
             QueryResult: ChromaDB query result containing documents, distances,
@@ -96,18 +498,95 @@ class VectorStore:
             ... )
             >>> for doc, distance in zip(results['documents'][0], results['distances'][0]):
             ...     print(f"Similarity: {1-distance:.3f}, Content: {doc[:100]}...")
+            >>> store.query(["Gran Turismo publisher"], mode="hybrid", lexical_shortcut=2.0)
         """
-        return self._collection.query(
-            query_texts=query_texts,
-            n_results=n_results,
-            where=where,
-            where_document=where_document,
-            include=['documents', 'distances', 'metadatas']
-        )
+        if mode not in self.QUERY_MODES:
+            raise ValueError(f"mode must be one of {self.QUERY_MODES}, got {mode!r}")
+        if mode == "dense":
+            plan = self.plan(where, where_document, n_results)
+            if plan.strategy == "search":
+                return self._collection.query(
+                    query_texts=query_texts if query_embeddings is None else None,
+                    query_embeddings=query_embeddings,
+                    n_results=n_results,
+                    where=where,
+                    where_document=where_document,
+                    include=['documents', 'distances', 'metadatas']
+                )
+            texts = [query_texts] if isinstance(query_texts, str) else query_texts
+            return self._ranked_result([
+                self._rank_candidates(text, plan.candidates, n_results) for text in texts
+            ])
+
+        if isinstance(query_texts, str):
+            query_texts = [query_texts]
+        candidates = self._filter_candidates(where, where_document)
+
+        # Rank a deeper pool than requested so fusion has overlap to work with
+        pool_size = max(n_results * 4, 20)
+        lexical = [self.lexical_index.search(text, pool_size, candidates) for text in query_texts]
+        needs_dense = [
+            i for i, ranking in enumerate(lexical)
+            if mode == "hybrid" and not self._is_exact_match(ranking, lexical_shortcut)
+            and (candidates is None or candidates)
+        ]
+        dense = {}
+        if needs_dense:
+            # One query (and embedding call) for every text that needs a dense ranking
+            dense_ids = self._collection.query(
+                query_texts=[query_texts[i] for i in needs_dense] if query_embeddings is None else None,
+                query_embeddings=[query_embeddings[i] for i in needs_dense] if query_embeddings is not None else None,
+                n_results=pool_size,
+                where=where,
+                where_document=where_document,
+                include=[]
+            )["ids"]
+            dense = dict(zip(needs_dense, dense_ids))
+
+        rankings = []
+        for i, ranking in enumerate(lexical):
+            if i not in dense:
+                # Lexical mode, an exact lexical match, or nothing matches the filters
+                rankings.append(ranking[:n_results])
+                continue
+            fused = reciprocal_rank_fusion(
+                [dense[i], [doc_id for doc_id, _ in ranking]],
+                weights=[dense_weight, lexical_weight],
+                k=rrf_k,
+            )
+            rankings.append(fused[:n_results])
+        return self._ranked_result(rankings)
+
+    @staticmethod
+    def _is_exact_match(lexical: List[tuple], ratio: Optional[float]) -> bool:
+        if not ratio or not lexical:
+            return False
+        return len(lexical) == 1 or lexical[0][1] >= ratio * lexical[1][1]
+
+    def _ranked_result(self, rankings: List[List[tuple]]) -> "QueryResult":
+        """Build a QueryResult from (id, score) rankings, fetching the documents by id"""
+        ids = list(dict.fromkeys(doc_id for ranking in rankings for doc_id, _ in ranking))
+        records = {}
+        if ids:
+            found = self._collection.get(ids=ids, include=["documents", "metadatas"])
+            records = {
+                doc_id: (content, metadata)
+                for doc_id, content, metadata in zip(found["ids"], found["documents"], found["metadatas"])
+            }
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for ranking in rankings:
+            ranking = [(doc_id, score) for doc_id, score in ranking if doc_id in records]
+            best = (ranking[0][1] if ranking else 0.0) or 1.0
+            result["ids"].append([doc_id for doc_id, _ in ranking])
+            result["documents"].append([records[doc_id][0] for doc_id, _ in ranking])
+            result["metadatas"].append([records[doc_id][1] for doc_id, _ in ranking])
+            result["distances"].append([1 - score / best for _, score in ranking])
+        return result
 
     def get(self, ids: Optional[List[str]] = None, 
             where: Optional[Dict[str, Any]] = None,
-            limit: Optional[int] = None) -> GetResult:
+            limit: Optional[int] = None) -> "GetResult":
         """
         Retrieve documents by ID or metadata filters without similarity search.
         
@@ -152,32 +631,94 @@ class VectorStoreManager:
     - OpenAI embedding function configuration
     - Vector store creation with consistent settings
     - Store lifecycle management (create, get, delete)
+
+    With ``backend="numpy"`` stores are backed by in-process
+    ``NumpyCollection``s instead of Chroma collections, persisted under
+    ``persist_directory/<store name>`` (or kept in memory without one).
     """
 
-    def __init__(self, openai_api_key: str):
-        self.chroma_client = chromadb.Client()
-        self.embedding_function = self._create_embedding_function(openai_api_key)
+    BACKENDS = ("chroma", "numpy")
+
+    def __init__(self, openai_api_key: str, embedding_cache_path: Optional[str] = None,
+                 backend: str = "chroma", persist_directory: Optional[str] = None):
+        """
+        Args:
+            openai_api_key: API key used for embeddings
+            embedding_cache_path: Optional SQLite file (or ":memory:") caching
+                embeddings by text, so identical text is only embedded once
+            backend: "chroma" (default) or "numpy"
+            persist_directory: Directory the numpy backend persists stores to
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"backend must be one of {self.BACKENDS}, got {backend!r}")
+        self.backend = backend
+        self.persist_directory = persist_directory
+        self.chroma_client = None
+        self._numpy_collections: Dict[str, NumpyCollection] = {}
+        if backend == "chroma":
+            import chromadb
+            self.chroma_client = chromadb.Client()
+        self.embedding_function = self._create_embedding_function(openai_api_key, embedding_cache_path)
+
+    def _create_embedding_function(self, api_key: str,
+                                   cache_path: Optional[str] = None) -> "EmbeddingFunction":
+        from chromadb.utils import embedding_functions
+        from lib.embeddings import CachedEmbeddingFunction
 
-    def _create_embedding_function(self, api_key: str) -> EmbeddingFunction:
         embeddings_fn = embedding_functions.OpenAIEmbeddingFunction(
             api_key=api_key
         )
+        if cache_path:
+            embeddings_fn = CachedEmbeddingFunction(embeddings_fn, cache_path)
         return embeddings_fn
 
     def __repr__(self):
+        if self.backend == "numpy":
+            return f"VectorStoreManager(backend='numpy', persist_directory={self.persist_directory!r})"
         return f"VectorStoreManager():{self.chroma_client}"
 
-    def get_store(self, name: str) -> Optional[VectorStore]:
+    def _make_store(self, chroma_collection: "ChromaCollection",
+                    lexical_fields: Optional[List[str]] = None) -> VectorStore:
+        if isinstance(chroma_collection, NumpyCollection):
+            return VectorStore(chroma_collection, lexical_fields=lexical_fields,
+                               embedding_function=self.embedding_function)
+        return VectorStore(chroma_collection, self.chroma_client.get_max_batch_size(),
+                           lexical_fields=lexical_fields, embedding_function=self.embedding_function)
+
+    def _numpy_path(self, name: str) -> Optional[str]:
+        return os.path.join(self.persist_directory, name) if self.persist_directory else None
+
+    def _numpy_collection(self, name: str, create: bool) -> Optional[NumpyCollection]:
+        if name not in self._numpy_collections:
+            path = self._numpy_path(name)
+            if not create and not (path and os.path.isdir(path)):
+                return None
+            self._numpy_collections[name] = NumpyCollection(self.embedding_function, path)
+        return self._numpy_collections[name]
+
+    def get_store(self, name: str, lexical_fields: Optional[List[str]] = None) -> Optional[VectorStore]:
+        if self.backend == "numpy":
+            collection = self._numpy_collection(name, create=False)
+            return self._make_store(collection, lexical_fields) if collection else None
         try:
-            chroma_collection = self.chroma_client.get_collection(name)
-            return VectorStore(chroma_collection)
+            chroma_collection = self.chroma_client.get_collection(
+                name=name,
+                embedding_function=self.embedding_function
+            )
+            return self._make_store(chroma_collection, lexical_fields)
         except Exception:
             return None
 
-    def create_store(self, store_name: str, force: bool = False) -> VectorStore:
+    def create_store(self, store_name: str, force: bool = False,
+                     lexical_fields: Optional[List[str]] = None) -> VectorStore:
         if force:
             self.delete_store(store_name)
 
+        if self.backend == "numpy":
+            if self.get_store(store_name) is not None:
+                print(f"Pass `force=True` or use `get_or_create_store` method")
+            return self._make_store(self._numpy_collection(store_name, create=True), lexical_fields)
+
         try:
             chroma_collection = self.chroma_client.create_collection(
                 name=store_name,
@@ -186,22 +727,97 @@ class VectorStoreManager:
         except Exception as e:
             print(f"Pass `force=True` or use `get_or_create_store` method")
 
-        return VectorStore(chroma_collection)
+        return self._make_store(chroma_collection, lexical_fields)
 
-    def get_or_create_store(self, store_name: str) -> VectorStore:
+    def get_or_create_store(self, store_name: str,
+                            lexical_fields: Optional[List[str]] = None) -> VectorStore:
+        if self.backend == "numpy":
+            return self._make_store(self._numpy_collection(store_name, create=True), lexical_fields)
         chroma_collection = self.chroma_client.get_or_create_collection(
             name=store_name,
             embedding_function=self.embedding_function
         )
-        return VectorStore(chroma_collection)
+        return self._make_store(chroma_collection, lexical_fields)
 
     def delete_store(self, store_name: str):
+        if self.backend == "numpy":
+            collection = self._numpy_collections.pop(store_name, None)
+            if collection:
+                collection.close()
+            path = self._numpy_path(store_name)
+            if path and os.path.isdir(path):
+                shutil.rmtree(path)
+            return
         try:
             self.chroma_client.delete_collection(name=store_name)
         except Exception:
             pass  # Store doesn't exist yet
 
 
+@dataclass
+class ManifestEntry:
+    """What was ingested from one file"""
+    mtime_ns: int
+    size: int
+    sha256: str
+    ids: List[str] = field(default_factory=list)
+    # Chunker.fingerprint the file was split with (None: one document per page)
+    chunking: Optional[str] = None
+
+
+class IngestManifest:
+    """
+    Record of the files ingested into each vector store.
+
+    Kept as a JSON file (when ``path`` is given) so unchanged files can be
+    skipped across runs without reading them.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._stores: Dict[str, Dict[str, ManifestEntry]] = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._stores = {
+                store: {source: ManifestEntry(**entry) for source, entry in files.items()}
+                for store, files in data.items()
+            }
+
+    def get(self, store_name: str, source: str) -> Optional[ManifestEntry]:
+        return self._stores.get(store_name, {}).get(source)
+
+    def sources(self, store_name: str) -> List[str]:
+        return list(self._stores.get(store_name, {}))
+
+    def set(self, store_name: str, source: str, entry: ManifestEntry):
+        self._stores.setdefault(store_name, {})[source] = entry
+
+    def remove(self, store_name: str, source: str):
+        self._stores.get(store_name, {}).pop(source, None)
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            store: {source: vars(entry) for source, entry in files.items()}
+            for store, files in self._stores.items()
+        }
+        # Write then rename, so an interrupted save never leaves a broken manifest
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 class CorpusLoaderService:
     """
     Service for loading documents from various sources into vector stores.
@@ -215,10 +831,76 @@ class CorpusLoaderService:
     - Vector store creation and management
     - Batch document insertion
     - Progress reporting and error handling
+
+    Ingestion is incremental and idempotent. Pages get stable ids derived
+    from their file, page number and content, only new or changed pages
+    are embedded, and pages that disappeared are deleted. A manifest of
+    file mtimes, sizes, hashes and chunk settings lets unchanged files be
+    skipped without being parsed.
+
+    Example:
+        >>> loader = CorpusLoaderService(manager, manifest_path="ingest_manifest.json")
+        >>> loader.load_directory("reports", "data/reports")  # nightly re-index
     """
 
-    def __init__(self, vector_store_manager: VectorStoreManager):
+    def __init__(self, vector_store_manager: VectorStoreManager,
+                 manifest_path: Optional[str] = None,
+                 chunker: Optional[Chunker] = None):
+        """
+        Args:
+            vector_store_manager: Manager providing the vector stores
+            manifest_path: Optional JSON file persisting the ingest manifest
+            chunker: Optional Chunker splitting pages into smaller documents
+                (default: one document per page)
+        """
         self.manager = vector_store_manager
+        self.manifest = IngestManifest(manifest_path)
+        self.chunker = chunker
+
+    def _is_current(self, store: VectorStore, entry: Optional[ManifestEntry]) -> bool:
+        """Whether the store still holds everything the manifest entry recorded"""
+        if entry is None:
+            return False
+        # The store may have been recreated since, e.g. by an in-memory client
+        return not entry.ids or len(store.get_ids(ids=entry.ids)) == len(entry.ids)
+
+    def _ingest_pdf(self, store_name: str, store: VectorStore, pdf_path: str) -> bool:
+        """Bring the store in sync with one PDF; returns whether anything was (re)parsed"""
+        source = os.path.abspath(pdf_path)
+        stat = os.stat(source)
+        entry = self.manifest.get(store_name, source)
+        current = self._is_current(store, entry)
+        chunking = self.chunker.fingerprint if self.chunker else None
+        # A file split with other chunk settings must be re-chunked even if unchanged
+        reusable = current and entry.chunking == chunking
+        if reusable and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+            return False
+
+        sha256 = file_hash(source)
+        if reusable and entry.sha256 == sha256:
+            # Touched but not modified
+            self.manifest.set(store_name, source,
+                              ManifestEntry(stat.st_mtime_ns, stat.st_size, sha256, entry.ids, chunking))
+            return False
+
+        old_ids = set(entry.ids) if current else set(store.get_ids(where={"source": source}))
+        new_ids: List[str] = []
+
+        def changed_pages() -> Iterator[Document]:
+            # Pages stream from the loader while earlier batches are embedded
+            documents = PDFLoader(pdf_path).iter_documents()
+            if self.chunker:
+                documents = self.chunker.chunk(documents)
+            for doc in documents:
+                new_ids.append(doc.id)
+                if doc.id not in old_ids:
+                    yield doc
+
+        store.upsert(changed_pages())
+        store.delete(ids=sorted(old_ids.difference(new_ids)))
+
+        self.manifest.set(store_name, source, ManifestEntry(stat.st_mtime_ns, stat.st_size, sha256, new_ids, chunking))
+        return True
 
     def load_pdf(self, store_name: str, pdf_path: str) -> VectorStore:
         """
@@ -244,9 +926,46 @@ class CorpusLoaderService:
         store = self.manager.get_or_create_store(store_name)
         print(f"VectorStore `{store_name}` ready!")
 
-        loader = PDFLoader(pdf_path)
-        document = loader.load()
-        store.add(document)
-        print(f"Pages from `{pdf_path}` added!")
+        if self._ingest_pdf(store_name, store, pdf_path):
+            print(f"Pages from `{pdf_path}` added!")
+        else:
+            print(f"`{pdf_path}` is unchanged, skipped")
+        self.manifest.save()
+
+        return store
+
+    def load_directory(self, store_name: str, directory: str, pattern: str = "*.pdf") -> VectorStore:
+        """
+        Sync a vector store with the PDFs in a directory.
+
+        New and changed files are (re)ingested, unchanged files are skipped,
+        and the pages of files that were removed from the directory are
+        deleted from the store.
+
+        Args:
+            store_name (str): Name of the vector store to create or use
+            directory (str): Directory holding the documents
+            pattern (str): Glob pattern of the files to ingest (default: "*.pdf")
+
+        Returns:
+            VectorStore: The synced vector store
+        """
+        store = self.manager.get_or_create_store(store_name)
+        root = os.path.abspath(directory)
+        paths = sorted(glob.glob(os.path.join(root, pattern)))
+
+        changed = sum(self._ingest_pdf(store_name, store, path) for path in paths)
+
+        present = set(paths)
+        removed = [
+            source for source in self.manifest.sources(store_name)
+            if os.path.dirname(source) == root and source not in present
+        ]
+        for source in removed:
+            store.delete(where={"source": source})
+            self.manifest.remove(store_name, source)
 
+        self.manifest.save()
+        print(f"VectorStore `{store_name}` synced: {changed} updated, "
+              f"{len(paths) - changed} unchanged, {len(removed)} removed")
         return store
@@ -0,0 +1,127 @@
+"""
+Microbenchmark: per-step LLM latency with a new client per step vs. the
+agent's reused, pooled LLM.
+
+Runs against a local stub of the chat completions endpoint, so it needs no
+API key and measures only client-side overhead (client construction, tool
+schema building and connection setup). The stub speaks plain HTTP, so the
+TLS handshake a real endpoint adds on every new connection is not included
+and the real-world gap is larger.
+
+Usage (from the starter directory):
+    python scripts/bench_llm_client.py --steps 200 --tools 10
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI  # noqa: E402
+
+from lib.agents import Agent  # noqa: E402
+from lib.llm import LLM  # noqa: E402
+from lib.messages import SystemMessage, UserMessage  # noqa: E402
+from lib.tooling import Tool  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal chat completions endpoint with keep-alive"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        data = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "ok"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_tools(count: int):
+    tools = []
+    for i in range(count):
+        def func(query: str, limit: int = 5) -> str:
+            """Look something up"""
+            return query
+        func.__name__ = f"tool_{i}"
+        tools.append(Tool(func))
+    return tools
+
+
+def measure(step, steps: int):
+    step()  # warm-up
+    timings = []
+    for _ in range(steps):
+        start = time.perf_counter()
+        step()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings, connections: int):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<28} median {statistics.median(timings):6.2f} ms   "
+          f"p95 {p95:6.2f} ms   connections {connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--tools", type=int, default=10)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    api_key = "stub"
+
+    tools = make_tools(args.tools)
+    messages = [SystemMessage(content="You are helpful."), UserMessage(content="hi")]
+
+    def new_client_step():
+        # What every agent step used to do: a new LLM with its own client
+        llm = LLM(model="stub", tools=tools, api_key=api_key, base_url=base_url)
+        llm.client = OpenAI(api_key=api_key, base_url=base_url)
+        llm.invoke(messages)
+        llm.client.close()
+
+    os.environ["OPENAI_API_KEY"] = api_key
+    os.environ["OPENAI_BASE_URL"] = base_url
+    agent = Agent("stub", "You are helpful.", tools=tools)
+
+    def reused_llm_step():
+        agent._get_llm().invoke(messages)
+
+    print(f"{args.steps} steps, {args.tools} tools, stub server at {base_url}")
+    for label, step in (("new client per step", new_client_step),
+                        ("reused agent LLM", reused_llm_step)):
+        StubHandler.connections = 0
+        report(label, measure(step, args.steps), StubHandler.connections)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
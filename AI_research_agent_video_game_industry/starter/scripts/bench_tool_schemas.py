@@ -0,0 +1,90 @@
+"""
+Benchmark: tool schema cost for an agent with a large toolset.
+
+Compares, for ``--tools`` tools (default 50):
+- building a request payload (``LLM._build_payload``) with the tool schemas
+  rebuilt on every request (as ``Tool.dict()`` used to) vs. the schemas an
+  LLM computes once and reuses, alone and with the JSON encoding of the
+  request body the client performs on every request
+- wrapping the functions in new ``Tool`` objects (signature and type hint
+  inspection each time) vs. the shared ``@tool`` cache
+
+Usage (from the starter directory):
+    python scripts/bench_tool_schemas.py --tools 50
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Dict, List, Literal, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.llm import LLM  # noqa: E402
+from lib.messages import SystemMessage, UserMessage  # noqa: E402
+from lib.tooling import Tool  # noqa: E402
+
+
+def make_functions(count: int):
+    functions = []
+    for i in range(count):
+        def func(query: str, platforms: List[str], sort: Literal["asc", "desc"] = "desc",
+                 limit: Optional[int] = None, filters: Optional[Dict[str, str]] = None) -> str:
+            """Search the game catalogue"""
+            return query
+        func.__name__ = f"search_{i}"
+        functions.append(func)
+    return functions
+
+
+class RebuildingLLM(LLM):
+    """LLM building its payload the way it did before schemas were cached"""
+
+    def _build_payload(self, messages):
+        payload = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "messages": [m.dict() for m in messages],
+        }
+        if self.tools:
+            payload["tools"] = [tool._build_schema() for tool in self.tools.values()]
+            payload["tool_choice"] = "auto"
+        return payload
+
+
+def bench(label: str, stmt, number: int):
+    seconds = min(timeit.repeat(stmt, number=number, repeat=5)) / number
+    print(f"{label:<40} {seconds * 1e6:9.1f} us")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tools", type=int, default=50)
+    args = parser.parse_args()
+
+    functions = make_functions(args.tools)
+    tools = [Tool.from_func(func) for func in functions]
+    rebuilding = RebuildingLLM(model="stub", tools=tools, api_key="stub")
+    cached = LLM(model="stub", tools=tools, api_key="stub")
+    messages = [SystemMessage(content="You are helpful."), UserMessage(content="Find racing games")]
+
+    print(f"{args.tools} tools")
+    before = bench("payload, schemas rebuilt", lambda: rebuilding._build_payload(messages), 200)
+    after = bench("payload, cached schemas", lambda: cached._build_payload(messages), 200)
+    print(f"{'':<40} {before / after:9.1f}x")
+
+    before = bench("payload + JSON body, schemas rebuilt",
+                   lambda: json.dumps(rebuilding._build_payload(messages)), 200)
+    after = bench("payload + JSON body, cached schemas",
+                  lambda: json.dumps(cached._build_payload(messages)), 200)
+    print(f"{'':<40} {before / after:9.1f}x")
+
+    new = bench("new Tool objects", lambda: [Tool(func) for func in functions], 20)
+    shared = bench("shared @tool cache", lambda: [Tool.from_func(func) for func in functions], 200)
+    print(f"{'':<40} {new / shared:9.0f}x")
+
+
+if __name__ == "__main__":
+    main()